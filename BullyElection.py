@@ -1,48 +1,80 @@
 import socket
+import sys
+import bisect
 from resources.utils import group_view_servers
 
 
 # Implementing a Bully leader election algorithm, method from: https://github.com/KimaruThagna/BullyAlgorithm/blob/master/bully.py 
 def process_Pool(id,message_case=0):
+    servers_list = group_view_servers.sorted_tuple() # cached, only re-sorted when membership changes
     
     if message_case==1: # sending the election request, message=election
-        highest_node=[]
-        for x in group_view_servers:
-            if id<x:
-                highest_node.append(x) 
-
-        if id==len(group_view_servers): # last node in the list
+        idx = bisect.bisect_right(servers_list, id)
+        if idx == len(servers_list): # last node in the list
              return None # theres no higher priority node
 
-        return highest_node # return list of higher priority nodes
-    if message_case==2 and id is not 1:#sending an ok mesage within the time limit
-        servers_list = sorted(list(group_view_servers))
-        return [servers_list[int(id)-2] ]# return id of predecessor node in priority hierachy
+        return list(servers_list[idx:]) # return list of higher priority nodes
+    if message_case==2 and id != 1:#sending an ok mesage within the time limit
+        idx = bisect.bisect_left(servers_list, id)
+        if idx == 0:
+            return None # no predecessor
+        return [servers_list[idx-1]]# return id of predecessor node in priority hierachy
     if message_case==3: #sending an Ive won message to other nodes
-        servers_list = sorted(list(group_view_servers))
-        return [x for x in servers_list if x != id] # return all nodes except the winner
+        idx = bisect.bisect_left(servers_list, id)
+        if idx < len(servers_list) and servers_list[idx] == id:
+            return list(servers_list[:idx] + servers_list[idx+1:]) # return all nodes except the winner
+        return list(servers_list)
 
 
 #simulate communication of nodes
-def sending_data(recepients,message): # recepients list and message to be sent
+def sending_data(recepients,message,verbose=False): # recepients list and message to be sent
+    # emulate send message via output; lines are returned as one bytes chunk so
+    # that the caller can write a whole election phase at once
+    if recepients is None:# no empty list
+        return b""
+    lines = [message+" sent to Node"+str(node) for node in recepients]
+    if verbose:
+        for line in lines:
+            print(line) # unbuffered, line by line, for debugging
+        return b""
+    return "".join(line+"\n" for line in lines).encode()
 
-    if recepients is not None:# no empty list
-        for node in recepients:
-            print(message+" sent to Node"+str(node)) # emulate send message via print
+# Write collected output with one lock acquisition and one write() call
+def flush_output(chunks):
+    data = b"".join(chunks)
+    if data:
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
 
 # Construct a node
-def node(myId):
+def node(myId,verbose=False):
+    chunks = []
     sending_list=process_Pool(myId,1)
     if  sending_list is None: # meaning no node is higher and thus, this node has won
-        sending_data(process_Pool(myId,3),"I've won") # when the highest node wins
+        chunks.append(sending_data(process_Pool(myId,3),"I've won",verbose)) # when the highest node wins
     else :
-        sending_data(sending_list,"Election") # forward an election message to your successor in the priority list
-    sending_data(process_Pool(myId,2),"OK") #send data to your predecessor in the priority list
+        chunks.append(sending_data(sending_list,"Election",verbose)) # forward an election message to your successor in the priority list
+    chunks.append(sending_data(process_Pool(myId,2),"OK",verbose)) #send data to your predecessor in the priority list
+    flush_output(chunks)
+
+# Decide a whole round at once: the highest ID always wins the bully election,
+# so there is no need to simulate the ELECTION/OK exchange to find the result
+def run_round(ids):
+    if not ids:
+        return None, [] # nobody to elect
+    winner = max(ids)
+    return winner, [x for x in ids if x != winner] # winner and the nodes it tells "I've won"
 
 #Initialize program by simulating the starting of nodes
 # by calling the node function
-node(1)
-node(2)
-node(3)
-node(4)
-node(5)
\ No newline at end of file
+if __name__ == "__main__":
+    verbose = "--verbose" in sys.argv
+    node(1,verbose)
+    node(2,verbose)
+    node(3,verbose)
+    node(4,verbose)
+    node(5,verbose)
+
+    winner, losers = run_round(group_view_servers.sorted_tuple())
+    if winner is not None:
+        flush_output([sending_data(losers,"Node"+str(winner)+" won",verbose)]) # announce the result of the round
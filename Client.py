@@ -1,39 +1,129 @@
+import asyncio
+import itertools
+import queue
 import socket
 import threading
 import time
 import uuid
-from resources.utils import MULTICAST_GROUP_ADDRESS
-from DiscoveryManager import ClientDiscovery
+from resources.utils import MULTICAST_GROUP_ADDRESS, CHAT_FRAME_HEADER, CHAT_FRAME_PREFIX, CHAT_FRAME_SUFFIX, FRAME_CHAT, FRAME_ACK, FRAME_FLAG_ALIVE, DEFAULT_GROUP_ID
+from resources.utils import unpack_chat_frame, user_id_for, backoff_delay
+from resources.net_batch import sendmmsg
+from DiscoveryManager import ClientDiscovery, JOIN_PREFIX
 from FaultTolerance import initialize_fault_tolerance, get_fault_tolerance_manager
 
+STATUS_REQUEST = b"status"
+RESPONSE_TIMEOUT = 10  # seconds to wait for a server reply
+DEGRADED_RESPONSE_TIMEOUT = 0.2  # shorter wait once replies have stopped arriving
+_ACK_TYPE = bytes([FRAME_ACK])
+_ACK_FRAME_MIN = CHAT_FRAME_HEADER.size  # Shorter datagrams can't be an ack
+_HEARTBEAT_PREFIX = b"CLIENT_HEARTBEAT:"
+_pack_frame_suffix = CHAT_FRAME_SUFFIX.pack
+_LISTENER_STOPPED = object()  # Queued to release a thread waiting for a reply
+
+# Every ChatClient in the process shares one event loop thread for its replies
+# and heartbeats, so embedding many clients doesn't cost a thread apiece
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+# Lines the event loop wants shown; a printer thread writes them so a slow
+# terminal never stalls the loop that drains the sockets
+_display_queue = queue.Queue(maxsize=1024)
+
+def _client_loop():
+    """Get the shared client event loop, starting its threads on first use"""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            _shared_loop = asyncio.new_event_loop()
+            threading.Thread(target=_shared_loop.run_forever, name="chat-client-loop", daemon=True).start()
+            threading.Thread(target=_print_display_queue, name="chat-client-display", daemon=True).start()
+        return _shared_loop
+
+def _print_display_queue():
+    while True:
+        print(_display_queue.get())
+
+def _display(line):
+    """Queue a line for the printer thread; dropped if the terminal is falling behind"""
+    try:
+        _display_queue.put_nowait(line)
+    except queue.Full:
+        pass  # Losing a status line beats losing datagrams
+
+async def _close_transport(transport):
+    """Close a datagram transport and let its close callbacks run"""
+    transport.close()  # Also closes the socket
+    await asyncio.sleep(0)
+
+class _ReplyProtocol(asyncio.DatagramProtocol):
+    """Hands datagrams received on the client socket to its ChatClient"""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def datagram_received(self, data, addr):
+        self.client._on_datagram(data, addr)
+    
+    def error_received(self, exc):
+        _display(f"Listener error: {exc}")
+
 class ChatClient:
     """Enhanced chat client with heartbeat and group view support"""
     
+    # Requested kernel socket buffer sizes; Linux caps them at net.core.rmem_max/wmem_max
+    RCVBUF_BYTES = 1 << 20
+    SNDBUF_BYTES = 1 << 20
+    
     def __init__(self, username=None):
         self.username = username or f"User_{uuid.uuid4().hex[:8]}"
         self.client_id = f"{self.username}_{uuid.uuid4().hex[:8]}"
+        self.user_id = user_id_for(self.client_id)
+        self.group_id = DEFAULT_GROUP_ID
         self.socket = None
         self.connected = False
-        self.heartbeat_thread = None
+        self._loop = None
+        self._transport = None
+        self._heartbeat_timer = None
+        self._responses = queue.Queue()
+        self._request_ids = itertools.count()
+        self._pending_acks = {}  # request id -> monotonic deadline for the server's FRAME_ACK
+        self._degraded = False  # set when a reply goes missing, cleared by the next one
         self.heartbeat_interval = 30  # seconds
+        self._last_tx = 0.0  # monotonic time of the last frame that proved we're alive
         self.ft_manager = None
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
+        self._closing = threading.Event()  # Set by disconnect() to cut short a reconnection wait
+        self._reconnect_thread = None
+        self._reconnect_lock = threading.Lock()
+        self._discovery = ClientDiscovery(self.client_id)  # Reused by every (re)connect
+        
+        # Pre-encoded protocol payloads; these never change for this client
+        self._client_id_b = self.client_id.encode()
+        self._heartbeat_msg = _HEARTBEAT_PREFIX + self._client_id_b
+        self._join_msg = JOIN_PREFIX + self._client_id_b
+        self._ack_prefix = CHAT_FRAME_PREFIX.pack(FRAME_ACK, self.group_id, self.user_id)
+        self._chat_prefix = CHAT_FRAME_PREFIX.pack(FRAME_CHAT | FRAME_FLAG_ALIVE, self.group_id, self.user_id)
         
     def connect(self):
         """Connect to the distributed chat system with enhanced discovery"""
+        self._closing.clear()
         try:
             # Use enhanced discovery manager
-            client_discovery = ClientDiscovery(self.client_id, max_retries=3, timeout=5)
-            response = client_discovery.discover_servers()
+            response = self._discovery.discover_servers()
             
             if response is None:
                 print("Failed to discover any servers")
                 return False
             
-            # Create socket for communication
+            # One socket carries everything: chat frames, heartbeats, status requests
+            # and the unicast replies to all of them. It stays on an ephemeral port
+            # rather than joining the multicast group: the servers answer unicast,
+            # and binding MULTICAST_PORT here would make a co-located server's
+            # replies and the group's chat traffic compete for the same socket.
+            # (Non-blocking once the event loop owns it; replies arrive via _on_datagram)
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.socket.settimeout(10)
+            self._size_buffers(self.socket)
             
             print(f"Successfully connected to distributed chat system")
             print(f"Server response: {response}")
@@ -47,12 +137,14 @@ class ChatClient:
             # Add reconnection recovery callback
             def on_connection_failure(failed_node_id):
                 print(f"Connection failure detected, attempting reconnection...")
-                self._attempt_reconnection()
+                self._start_reconnection()
             
             self.ft_manager.register_recovery_callback('crash', on_connection_failure)
             self.ft_manager.start()
             
-            # Start heartbeat thread
+            # Start receiving replies and sending heartbeats on the shared loop
+            self._announce()
+            self.start_listener()
             self.start_heartbeat()
             
             return True
@@ -61,22 +153,100 @@ class ChatClient:
             print(f"Failed to connect: {e}")
             return False
     
+    def _size_buffers(self, sock):
+        """Enlarge the socket's kernel buffers so reply bursts aren't dropped"""
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RCVBUF_BYTES)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.SNDBUF_BYTES)
+        except OSError as e:
+            print(f"Could not resize socket buffers: {e}")
+            return
+        print(f"Socket buffers: rcv={sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} "
+              f"snd={sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)} bytes")
+    
+    def _announce(self):
+        """Register this socket's address with the servers: join and first heartbeat in one batch"""
+        sendmmsg(self.socket, [(self._join_msg, MULTICAST_GROUP_ADDRESS),
+                               (self._heartbeat_msg, MULTICAST_GROUP_ADDRESS)])
+        self._last_tx = time.monotonic()
+    
+    def start_listener(self):
+        """Serve the client socket from the shared event loop"""
+        self._loop = _client_loop()
+        endpoint = self._loop.create_datagram_endpoint(lambda: _ReplyProtocol(self), sock=self.socket)
+        self._transport, _ = asyncio.run_coroutine_threadsafe(endpoint, self._loop).result(RESPONSE_TIMEOUT)
+    
+    def stop_listener(self):
+        """Detach the client socket and heartbeat from the shared event loop"""
+        if self._heartbeat_timer is not None:
+            self._loop.call_soon_threadsafe(self._heartbeat_timer.cancel)
+            self._heartbeat_timer = None
+        if self._transport is None:
+            return
+        transport, self._transport = self._transport, None
+        try:
+            asyncio.run_coroutine_threadsafe(_close_transport(transport), self._loop).result(1)
+        except Exception as e:
+            print(f"Listener stopped: {e}")
+        # No more replies can arrive; wake only the thread waiting for one, if any
+        self._responses.put((_LISTENER_STOPPED, None))
+    
+    def _on_datagram(self, data, server_addr):
+        """Route a datagram received by the event loop"""
+        # Match acks for our group and user on the raw header bytes, rejecting short datagrams first
+        if len(data) >= _ACK_FRAME_MIN and data.startswith(self._ack_prefix):
+            self._handle_ack(data)
+        elif data[:1] != _ACK_TYPE:  # Acks for another group/user are dropped undecoded
+            self._responses.put((data.decode(errors='replace'), server_addr))
+    
+    def _handle_ack(self, data):
+        """Report the first server acknowledgement for a sent message"""
+        _, _, _, request_id, payload = unpack_chat_frame(data)
+        if self._pending_acks.pop(request_id, None) is not None:
+            self._degraded = False
+            _display(f"Server response: {str(payload, 'utf-8', 'replace')}")
+        # Otherwise another server already acknowledged it, or it expired
+    
+    def _expire_pending_acks(self):
+        """Drop messages whose acknowledgement never arrived"""
+        now = time.monotonic()
+        for request_id, deadline in list(self._pending_acks.items()):
+            if deadline < now and self._pending_acks.pop(request_id, None) is not None:
+                self._degraded = True
+                _display(f"No server acknowledged message #{request_id}")
+    
+    def _wait_for_response(self):
+        """Get the next server reply received by the listener"""
+        # Don't stall the UI for the full timeout when the server already looks gone
+        timeout = DEGRADED_RESPONSE_TIMEOUT if self._degraded else RESPONSE_TIMEOUT
+        try:
+            response, server_addr = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self._degraded = True
+            raise socket.timeout("no response from server") from None
+        if response is _LISTENER_STOPPED:
+            raise ConnectionError("disconnected while waiting for a response")
+        self._degraded = False
+        return response
+    
     def start_heartbeat(self):
-        """Start sending periodic heartbeat messages"""
-        if self.heartbeat_thread is None:
-            self.heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
-            self.heartbeat_thread.start()
-    
-    def _heartbeat_loop(self):
-        """Send heartbeat messages periodically"""
-        while self.connected:
-            try:
-                heartbeat_msg = f"CLIENT_HEARTBEAT:{self.client_id}"
-                self.socket.sendto(heartbeat_msg.encode(), MULTICAST_GROUP_ADDRESS)
-                time.sleep(self.heartbeat_interval)
-            except Exception as e:
-                print(f"Heartbeat failed: {e}")
-                break
+        """Start sending periodic heartbeat messages from the event loop"""
+        self._loop.call_soon_threadsafe(self._heartbeat_tick)
+    
+    def _heartbeat_tick(self):
+        """Send a heartbeat only when no chat frame has been sent for a full interval"""
+        if not self.connected:
+            return
+        try:
+            if time.monotonic() - self._last_tx >= self.heartbeat_interval:
+                self.socket.sendto(self._heartbeat_msg, MULTICAST_GROUP_ADDRESS)
+                self._last_tx = time.monotonic()
+        except Exception as e:
+            _display(f"Heartbeat failed: {e}")
+            return
+        # Due a full interval after the last frame sent; the loop clock is time.monotonic(),
+        # so the deadline doesn't drift with scheduling delays
+        self._heartbeat_timer = self._loop.call_at(self._last_tx + self.heartbeat_interval, self._heartbeat_tick)
     
     def send_message(self, message):
         """Send a message to the chat system"""
@@ -85,12 +255,16 @@ class ChatClient:
             return False
         
         try:
-            formatted_msg = f"[{self.username}]: {message}"
-            self.socket.sendto(formatted_msg.encode(), MULTICAST_GROUP_ADDRESS)
+            self._expire_pending_acks()
             
-            # Wait for response
-            response, server_addr = self.socket.recvfrom(1024)
-            print(f"Server response: {response.decode()}")
+            # The listener reports the ack when it arrives; don't block on it here
+            request_id = next(self._request_ids) % 0xFFFF + 1
+            self._pending_acks[request_id] = time.monotonic() + RESPONSE_TIMEOUT
+            payload = message.encode()
+            # Only the request id and length change per message; the rest of the header is cached
+            frame = b"".join((self._chat_prefix, _pack_frame_suffix(request_id, len(payload)), payload))
+            self.socket.sendto(frame, MULTICAST_GROUP_ADDRESS)
+            self._last_tx = time.monotonic()  # Frame carries the alive flag
             return True
             
         except Exception as e:
@@ -104,25 +278,45 @@ class ChatClient:
             return
         
         try:
-            status_msg = "status"
-            self.socket.sendto(status_msg.encode(), MULTICAST_GROUP_ADDRESS)
+            # Drop replies nobody waited for (welcome messages, extra status answers)
+            while not self._responses.empty():
+                self._responses.get_nowait()
+            self.socket.sendto(STATUS_REQUEST, MULTICAST_GROUP_ADDRESS)
             
             # Wait for response
-            response, server_addr = self.socket.recvfrom(1024)
-            print(f"System Status: {response.decode()}")
+            response = self._wait_for_response()
+            print(f"System Status: {response}")
             
         except Exception as e:
             print(f"Failed to get status: {e}")
     
     def disconnect(self):
         """Disconnect from the chat system"""
+        self._closing.set()
         self.connected = False
         if self.ft_manager:
             self.ft_manager.stop()
+        self.stop_listener()
         if self.socket:
             self.socket.close()
+        self._discovery.close()
         print(f"Client {self.username} disconnected")
     
+    def _start_reconnection(self):
+        """Reconnect on a worker thread; the failure callback runs on the fault tolerance reactor"""
+        with self._reconnect_lock:
+            if self._reconnect_thread and self._reconnect_thread.is_alive():
+                return  # Already reconnecting
+            self._reconnect_thread = threading.Thread(target=self._reconnect_loop,
+                                                      name="chat-client-reconnect", daemon=True)
+            self._reconnect_thread.start()
+    
+    def _reconnect_loop(self):
+        """Retry until reconnected, out of attempts, or disconnect() is called"""
+        while not self._closing.is_set():
+            if self._attempt_reconnection() or self.reconnect_attempts >= self.max_reconnect_attempts:
+                return
+    
     def _attempt_reconnection(self):
         """Attempt to reconnect to the system"""
         if self.reconnect_attempts >= self.max_reconnect_attempts:
@@ -132,13 +326,18 @@ class ChatClient:
         self.reconnect_attempts += 1
         print(f"Reconnection attempt {self.reconnect_attempts}/{self.max_reconnect_attempts}")
         
-        # Disconnect current connection
+        # Disconnect current connection; connect() starts a fresh fault tolerance manager
         self.connected = False
+        if self.ft_manager:
+            self.ft_manager.stop()
+            self.ft_manager = None
+        self.stop_listener()
         if self.socket:
             self.socket.close()
         
-        # Wait before reconnecting
-        time.sleep(2 ** self.reconnect_attempts)  # Exponential backoff
+        # Wait before reconnecting (exponential backoff with jitter); disconnect() ends the wait
+        if self._closing.wait(backoff_delay(self.reconnect_attempts)):
+            return False
         
         # Attempt to reconnect
         if self.connect():
@@ -160,13 +359,15 @@ class ChatClient:
         print("  - '/quit' to exit")
         print("-" * 50)
         
+        prompt = f"{self.username}> "
         try:
             while self.connected:
-                user_input = input(f"{self.username}> ").strip()
+                user_input = input(prompt).strip()
+                command = user_input.lower() if user_input.startswith('/') else None
                 
-                if user_input.lower() == '/quit':
+                if command == '/quit':
                     break
-                elif user_input.lower() == '/status':
+                elif command == '/status':
                     self.request_status()
                 elif user_input:
                     self.send_message(user_input)
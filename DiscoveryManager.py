@@ -1,46 +1,146 @@
+import heapq
+import itertools
+import logging
 import socket
+import selectors
+import sys
 import threading
 import time
-import json
-from typing import Set, Dict, Optional, Callable
-from resources.utils import MULTICAST_GROUP_ADDRESS, group_view_servers, server_last_seen
+from types import MappingProxyType
+from typing import Set, Dict, Mapping, Optional, Callable
+from resources.net_batch import RecvBatch, sendmmsg
+from resources.utils import MULTICAST_GROUP_ADDRESS, MAX_RETRY_ATTEMPTS, DISCOVERY_TIMEOUT, group_view_servers, server_last_seen, backoff_delay
+from resources.utils import (DISCOVERY_ALIVE, DISCOVERY_PROBE, DISCOVERY_RESPONSE, DISCOVERY_PROBE_CAPABLE,
+                             pack_discovery_frame, is_discovery_frame, unpack_discovery_frame)
 from LeaderElection import trigger_election
+from GroupView import get_group_view
 
-class DiscoveryPhase:
-    """Represents different phases of discovery"""
-    STARTUP = "startup"
-    RUNNING = "running"
-    JOINING = "joining"
+# Per-datagram messages go through the logger so they cost nothing when disabled
+logger = logging.getLogger(__name__)
+
+JOIN_PREFIX = b"join:"
+
+# Discovery frames the probe socket acts on, mapped to how they are logged;
+# both kinds of sighting are handled the same way
+SIGHTING_SOURCES = {DISCOVERY_RESPONSE: "response", DISCOVERY_ALIVE: "alive"}
+
+def _no_callback(*args):
+    """Stand-in for events nobody registered a callback for"""
+
+# Discovery phases; interned so the phase checks are identity comparisons
+STARTUP = sys.intern("startup")
+RUNNING = sys.intern("running")
+JOINING = sys.intern("joining")
 
 class DiscoveryManager:
     """Enhanced discovery manager with proper timing and retry mechanisms"""
     
     def __init__(self, server_id: str, server_ip: str, hostname: str):
         self.server_id = server_id
+        self._server_id_int = int(server_id)  # As carried in discovery frames
         self.server_ip = server_ip
         self.hostname = hostname
         
+        # Outgoing frames only depend on this server's identity, so pack them once
+        self._probe_frame = pack_discovery_frame(DISCOVERY_PROBE, server_ip, hostname, self._server_id_int)
+        self._announcement_batch = [
+            (pack_discovery_frame(DISCOVERY_ALIVE, server_ip, hostname, self._server_id_int), MULTICAST_GROUP_ADDRESS),
+            (pack_discovery_frame(DISCOVERY_PROBE_CAPABLE, server_ip, hostname, self._server_id_int),
+             MULTICAST_GROUP_ADDRESS),
+        ]
+        
         # Discovery configuration
         self.startup_discovery_timeout = 15  # seconds
         self.probe_timeout = 5  # seconds
         self.max_retries = 3
         self.retry_delay = 2  # seconds
+        self.maintenance_interval = 30  # seconds between maintenance probe rounds
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
+        
+        # Statistics live in one dict that the properties below update in place;
+        # get_discovery_statistics hands out a read-only view of it
+        self._stats = {
+            'discovery_phase': STARTUP,
+            'discovery_complete': False,
+            'discovered_servers_count': 0,
+            'discovered_servers': (),
+            'discovery_attempts': 0,
+            'successful_discoveries': 0,
+            'failed_discoveries': 0
+        }
+        self._stats_view = MappingProxyType(self._stats)
         
         # Discovery state
-        self.discovery_phase = DiscoveryPhase.STARTUP
-        self.discovery_complete = False
-        self.discovered_servers: Set[str] = set()
+        self.discovered_servers: Set[int] = set()
+        self._pending_seen: Dict[int, float] = {}  # Sightings not yet written to the shared views
         self.discovery_callbacks: Dict[str, Callable] = {}
         
-        # Threading
+        # One socket per discovery run carries both probes and announcements;
+        # rounds wait on it in a selector. It is deliberately not fanned out over
+        # SO_REUSEPORT siblings: replies come back unicast to this ephemeral port,
+        # recvmmsg already drains a burst per syscall, and extra reader threads
+        # would only contend for the GIL and the shared views.
+        self._probe_socket = None
+        self._probe_selector = None
+        self._open_probe_socket()
+        self._probe_batch = RecvBatch(32, 1024)  # Reply bursts are read up to 32 per syscall
+        
+        # Reactor: one thread runs announcement and discovery jobs from a heap
+        # of (deadline, seq, job, args); the stop event doubles as its sleep
         self.discovery_thread = None
-        self.announcement_thread = None
         self.running = False
-        
-        # Statistics
-        self.discovery_attempts = 0
-        self.successful_discoveries = 0
-        self.failed_discoveries = 0
+        self._stop = threading.Event()
+        self._jobs = []
+        self._job_seq = itertools.count()
+    
+    @property
+    def discovery_phase(self) -> str:
+        return self._stats['discovery_phase']
+    
+    @discovery_phase.setter
+    def discovery_phase(self, phase: str):
+        self._stats['discovery_phase'] = phase
+    
+    @property
+    def discovery_complete(self) -> bool:
+        return self._stats['discovery_complete']
+    
+    @discovery_complete.setter
+    def discovery_complete(self, complete: bool):
+        self._stats['discovery_complete'] = complete
+    
+    @property
+    def discovery_attempts(self) -> int:
+        return self._stats['discovery_attempts']
+    
+    @discovery_attempts.setter
+    def discovery_attempts(self, count: int):
+        self._stats['discovery_attempts'] = count
+    
+    @property
+    def successful_discoveries(self) -> int:
+        return self._stats['successful_discoveries']
+    
+    @successful_discoveries.setter
+    def successful_discoveries(self, count: int):
+        self._stats['successful_discoveries'] = count
+    
+    @property
+    def failed_discoveries(self) -> int:
+        return self._stats['failed_discoveries']
+    
+    @failed_discoveries.setter
+    def failed_discoveries(self, count: int):
+        self._stats['failed_discoveries'] = count
+    
+    def _add_discovered_server(self, server_id: int) -> bool:
+        """Record a discovered server and refresh its statistics entries; True if it's new"""
+        if server_id in self.discovered_servers:
+            return False
+        self.discovered_servers.add(server_id)
+        self._stats['discovered_servers'] = tuple(self.discovered_servers)
+        self._stats['discovered_servers_count'] = len(self.discovered_servers)
+        return True
     
     def start_discovery(self):
         """Start the discovery process"""
@@ -48,68 +148,107 @@ class DiscoveryManager:
             return
             
         self.running = True
+        if self._probe_socket is None:
+            self._open_probe_socket()  # Closed by an earlier stop_discovery
         print(f"Starting discovery for server {self.server_id}")
         
-        # Start announcement thread immediately
-        self.announcement_thread = threading.Thread(target=self._announcement_loop, daemon=True)
-        self.announcement_thread.start()
+        # Announcements go out immediately, then discovery starts
+        self._jobs = []
+        self._schedule(0, self._announce)
+        self._schedule(0, self._discovery_tick)
         
-        # Start discovery thread
-        self.discovery_thread = threading.Thread(target=self._discovery_loop, daemon=True)
+        # One reactor thread runs both; a fresh stop event per run means a
+        # reactor left over from a previous run can never pick up new jobs
+        self._stop = threading.Event()
+        self.discovery_thread = threading.Thread(target=self._reactor, args=(self._stop,), daemon=True)
         self.discovery_thread.start()
     
     def stop_discovery(self):
-        """Stop the discovery process"""
+        """Stop the discovery process; start_discovery may be called again afterwards"""
         self.running = False
+        self._stop.set()  # Wakes the reactor, or stops it after the round in progress
         if self.discovery_thread:
-            self.discovery_thread.join()
-        if self.announcement_thread:
-            self.announcement_thread.join()
+            self.discovery_thread.join(timeout=self.probe_timeout + 1)
+            self.discovery_thread = None
+        if self._probe_socket is None:
+            return  # Already stopped
+        self._probe_selector.close()
+        self._probe_socket.close()
+        self._probe_selector = self._probe_socket = None
+    
+    def _open_probe_socket(self):
+        self._probe_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._probe_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        self._probe_socket.setblocking(False)
+        self._probe_selector = selectors.DefaultSelector()
+        self._probe_selector.register(self._probe_socket, selectors.EVENT_READ)
     
     def add_discovery_callback(self, event_type: str, callback: Callable):
         """Add callback for discovery events"""
         self.discovery_callbacks[event_type] = callback
     
-    def _discovery_loop(self):
-        """Main discovery loop with different phases"""
-        while self.running:
-            if self.discovery_phase == DiscoveryPhase.STARTUP:
-                self._startup_discovery()
-            elif self.discovery_phase == DiscoveryPhase.RUNNING:
-                self._maintenance_discovery()
-            elif self.discovery_phase == DiscoveryPhase.JOINING:
-                self._joining_discovery()
-            
-            time.sleep(10)  # Check every 10 seconds
+    def _schedule(self, delay: float, job: Callable, *args):
+        """Run job(*args) on the reactor thread after delay seconds"""
+        heapq.heappush(self._jobs, (time.monotonic() + delay, next(self._job_seq), job, args))
+    
+    def _reactor(self, stop: threading.Event):
+        """Run the earliest due job until stopped; waits on the stop event in between"""
+        while self._jobs:
+            deadline, _, job, args = self._jobs[0]
+            if stop.wait(max(0, deadline - time.monotonic())):
+                return
+            heapq.heappop(self._jobs)
+            try:
+                job(*args)
+            except Exception as e:
+                logger.error("Error in %s: %s", job.__name__, e)
     
-    def _startup_discovery(self):
-        """Comprehensive startup discovery with retries"""
-        print(f"Server {self.server_id}: Starting startup discovery phase")
+    def _discovery_tick(self):
+        """Run the handler for the current discovery phase, then check again in 10 seconds"""
+        if self.discovery_phase is STARTUP:
+            self._startup_discovery()
+            return  # Reschedules the tick itself once startup completes
+        elif self.discovery_phase is JOINING:
+            self._joining_discovery()
+            return  # Likewise once joining completes
         
-        # Perform multiple discovery rounds
-        for attempt in range(self.max_retries):
-            self.discovery_attempts += 1
-            print(f"Discovery attempt {attempt + 1}/{self.max_retries}")
-            
-            discovered_count = self._perform_discovery_round()
-            
-            if discovered_count > 0:
-                self.successful_discoveries += 1
-                print(f"Discovered {discovered_count} servers in attempt {attempt + 1}")
-            else:
-                self.failed_discoveries += 1
-                print(f"No servers discovered in attempt {attempt + 1}")
-            
-            if attempt < self.max_retries - 1:
-                time.sleep(self.retry_delay)
+        # Scheduled first so that a failing round can't end the tick chain
+        self._schedule(10, self._discovery_tick)  # Check every 10 seconds
+        if self.discovery_phase is RUNNING:
+            self._maintenance_discovery()
+    
+    def _startup_discovery(self, attempt: int = 0):
+        """Comprehensive startup discovery with retries, one reactor job per attempt"""
+        if attempt == 0:
+            print(f"Server {self.server_id}: Starting startup discovery phase")
+        
+        self.discovery_attempts += 1
+        print(f"Discovery attempt {attempt + 1}/{self.max_retries}")
+        
+        discovered_count = self._perform_discovery_round()
+        
+        if discovered_count > 0:
+            self.successful_discoveries += 1
+            print(f"Discovered {discovered_count} servers in attempt {attempt + 1}")
+        else:
+            self.failed_discoveries += 1
+            print(f"No servers discovered in attempt {attempt + 1}")
+        
+        if attempt < self.max_retries - 1:
+            self._schedule(self.retry_delay, self._startup_discovery, attempt + 1)
+            return
         
         # Wait additional time for late responses
         print(f"Waiting {self.startup_discovery_timeout - (self.max_retries * self.retry_delay)} seconds for additional responses...")
-        time.sleep(max(0, self.startup_discovery_timeout - (self.max_retries * self.retry_delay)))
-        
+        self._schedule(max(0, self.startup_discovery_timeout - (self.max_retries * self.retry_delay)),
+                       self._complete_startup_discovery)
+    
+    def _complete_startup_discovery(self):
+        """Finish the startup phase and schedule the initial election"""
         # Discovery complete
         self.discovery_complete = True
-        self.discovery_phase = DiscoveryPhase.RUNNING
+        self.discovery_phase = RUNNING
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
         
         print(f"Startup discovery complete. Found {len(self.discovered_servers)} servers: {self.discovered_servers}")
         
@@ -117,32 +256,37 @@ class DiscoveryManager:
         self._trigger_callback('startup_complete')
         
         # Wait a bit more before triggering election to ensure all servers are ready
-        time.sleep(3)
+        self._schedule(3, self._startup_election)
+        self._schedule(13, self._discovery_tick)  # The election delay plus the usual 10 second tick
+    
+    def _startup_election(self):
         print(f"Triggering election after startup discovery")
         trigger_election()
     
     def _maintenance_discovery(self):
         """Ongoing discovery for maintenance"""
         # Perform lightweight discovery every 30 seconds
-        if time.time() % 30 < 10:  # Every 30 seconds
+        now = time.monotonic()
+        if now >= self._next_maintenance:
             self._perform_discovery_round()
+            self._next_maintenance = now + self.maintenance_interval
     
-    def _joining_discovery(self):
-        """Discovery when joining an existing system"""
-        print(f"Server {self.server_id}: Performing joining discovery")
+    def _joining_discovery(self, attempt: int = 0):
+        """Discovery when joining an existing system, one reactor job per attempt"""
+        if attempt == 0:
+            print(f"Server {self.server_id}: Performing joining discovery")
         
-        for attempt in range(self.max_retries):
-            discovered_count = self._perform_discovery_round()
-            
-            if discovered_count > 0:
-                break
-            
-            if attempt < self.max_retries - 1:
-                time.sleep(self.retry_delay)
+        discovered_count = self._perform_discovery_round()
+        
+        if discovered_count == 0 and attempt < self.max_retries - 1:
+            self._schedule(self.retry_delay, self._joining_discovery, attempt + 1)
+            return
         
         # Switch to running mode
-        self.discovery_phase = DiscoveryPhase.RUNNING
+        self.discovery_phase = RUNNING
+        self._next_maintenance = time.monotonic() + self.maintenance_interval
         self._trigger_callback('joining_complete')
+        self._schedule(10, self._discovery_tick)
     
     def _perform_discovery_round(self) -> int:
         """Perform one round of server discovery"""
@@ -150,174 +294,161 @@ class DiscoveryManager:
         
         try:
             # Send probe message
-            probe_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            probe_socket.settimeout(self.probe_timeout)
-            
-            probe_msg = f"SERVER_PROBE:{self.server_ip}:{self.server_id}"
-            probe_socket.sendto(probe_msg.encode(), MULTICAST_GROUP_ADDRESS)
+            self._probe_socket.sendto(self._probe_frame, MULTICAST_GROUP_ADDRESS)
             
-            # Listen for responses
-            start_time = time.time()
-            while time.time() - start_time < self.probe_timeout:
-                try:
-                    data, addr = probe_socket.recvfrom(1024)
-                    response = data.decode()
-                    
-                    if response.startswith("SERVER_RESPONSE:"):
-                        self._process_server_response(response, addr)
-                    elif response.startswith("SERVER_ALIVE:"):
-                        self._process_server_alive(response)
-                        
-                except socket.timeout:
+            # Listen for responses, sleeping in the selector between bursts
+            deadline = time.monotonic() + self.probe_timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._probe_selector.select(remaining):
                     break
-                except Exception as e:
-                    print(f"Error receiving discovery response: {e}")
-                    break
-            
-            probe_socket.close()
+                self._drain_probe_socket()
             
         except Exception as e:
-            print(f"Error in discovery round: {e}")
+            logger.error("Error in discovery round: %s", e)
             return 0
         
         return len(self.discovered_servers) - initial_count
     
-    def _process_server_response(self, response: str, addr):
-        """Process SERVER_RESPONSE message"""
-        try:
-            parts = response.split(":")
-            if len(parts) >= 3:
-                response_type, hostname, server_ip = parts[0], parts[1], parts[2]
-                server_id = hash(server_ip + hostname) % 10000
-                
-                if str(server_id) != str(self.server_id):  # Don't discover self
-                    self.discovered_servers.add(str(server_id))
-                    
-                    # Add to global views
-                    group_view_servers.add(server_id)
-                    server_last_seen[server_id] = time.time()
+    def _drain_probe_socket(self):
+        """Handle every datagram queued on the probe socket"""
+        # Sighting callbacks update the group view; publish the whole burst once
+        with get_group_view().bulk_update():
+            while True:
+                batch = self._probe_batch.recv(self._probe_socket)
+                for data, addr in batch:
+                    if not is_discovery_frame(data):
+                        continue  # Only discovery frames are answered to the probe socket
                     
-                    print(f"Discovered server via response: {hostname} (ID: {server_id})")
-                    self._trigger_callback('server_discovered', server_id)
-                    
-        except Exception as e:
-            print(f"Error processing server response: {e}")
-    
-    def _process_server_alive(self, message: str):
-        """Process SERVER_ALIVE message"""
-        try:
-            parts = message.split(":")
-            if len(parts) >= 3:
-                msg_type, server_ip, hostname = parts[0], parts[1], parts[2]
-                server_id = hash(server_ip + hostname) % 10000
+                    msg_type, server_ip, hostname, server_id = unpack_discovery_frame(data)
+                    source = SIGHTING_SOURCES.get(msg_type)
+                    if source:
+                        self._process_server_sighting(source, server_id, hostname)
                 
-                if str(server_id) != str(self.server_id):  # Don't discover self
-                    self.discovered_servers.add(str(server_id))
-                    
-                    # Add to global views
-                    group_view_servers.add(server_id)
-                    server_last_seen[server_id] = time.time()
-                    
-                    print(f"Discovered server via alive: {hostname} (ID: {server_id})")
-                    self._trigger_callback('server_discovered', server_id)
-                    
-        except Exception as e:
-            print(f"Error processing server alive: {e}")
+                if len(batch) < self._probe_batch.count:
+                    break  # Queue is drained; a full batch means more may be waiting
+        self._flush_server_views()
     
-    def _announcement_loop(self):
-        """Continuous server announcement loop"""
-        announce_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        announce_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
-        
-        while self.running:
-            try:
-                # Enhanced announcement with discovery phase info
-                server_info = f"SERVER_ALIVE:{self.server_ip}:{self.hostname}:{self.discovery_phase}"
-                announce_socket.sendto(server_info.encode(), MULTICAST_GROUP_ADDRESS)
+    def _flush_server_views(self):
+        """Apply staged sightings to the shared server views in one update each"""
+        pending = self._pending_seen
+        if not pending:
+            return
+        new_servers = pending.keys() - group_view_servers
+        if new_servers:
+            group_view_servers.update(new_servers)
+        server_last_seen.update(pending)
+        pending.clear()
+    
+    def _process_server_sighting(self, source: str, server_id: int, hostname: str):
+        """Process a DISCOVERY_RESPONSE or DISCOVERY_ALIVE frame"""
+        try:
+            if server_id != self._server_id_int:  # Don't discover self
+                is_new = self._add_discovered_server(server_id)
                 
-                # Also send discovery probe response capability
-                probe_response = f"SERVER_PROBE_CAPABLE:{self.server_ip}:{self.hostname}:{self.server_id}"
-                announce_socket.sendto(probe_response.encode(), MULTICAST_GROUP_ADDRESS)
+                # Staged; _flush_server_views applies the whole burst at once
+                self._pending_seen[server_id] = time.time()
                 
-                time.sleep(10)  # Announce every 10 seconds
+                if is_new:
+                    logger.info("Discovered server via %s: %s (ID: %s)", source, hostname, server_id)
+                elif logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Refreshed server via %s: %s (ID: %s)", source, hostname, server_id)
+                self._trigger_callback('server_discovered', server_id)
                 
-            except Exception as e:
-                print(f"Error in announcement loop: {e}")
-                time.sleep(10)
+        except Exception as e:
+            logger.error("Error processing server %s: %s", source, e)
+    
+    def _announce(self):
+        """Announce this server, then again every 10 seconds"""
+        try:
+            # Announce presence and probe response capability in one sendmmsg batch
+            sendmmsg(self._probe_socket, self._announcement_batch)
+        except Exception as e:
+            print(f"Error in announcement loop: {e}")
         
-        announce_socket.close()
+        self._schedule(10, self._announce)  # Announce every 10 seconds
     
     def _trigger_callback(self, event_type: str, *args):
         """Trigger discovery callback"""
-        if event_type in self.discovery_callbacks:
-            try:
-                self.discovery_callbacks[event_type](*args)
-            except Exception as e:
-                print(f"Error in discovery callback {event_type}: {e}")
-    
-    def get_discovery_statistics(self) -> Dict:
-        """Get discovery statistics"""
-        return {
-            'discovery_phase': self.discovery_phase,
-            'discovery_complete': self.discovery_complete,
-            'discovered_servers_count': len(self.discovered_servers),
-            'discovered_servers': list(self.discovered_servers),
-            'discovery_attempts': self.discovery_attempts,
-            'successful_discoveries': self.successful_discoveries,
-            'failed_discoveries': self.failed_discoveries
-        }
+        try:
+            self.discovery_callbacks.get(event_type, _no_callback)(*args)
+        except Exception as e:
+            print(f"Error in discovery callback {event_type}: {e}")
+    
+    def get_discovery_statistics(self) -> Mapping:
+        """Get a live, read-only view of the discovery statistics"""
+        return self._stats_view
     
     def force_discovery_phase(self, phase: str):
         """Force discovery to a specific phase (for testing)"""
-        self.discovery_phase = phase
+        self.discovery_phase = sys.intern(phase)
         print(f"Discovery phase forced to: {phase}")
     
     def trigger_joining_discovery(self):
         """Trigger discovery when joining an existing system"""
-        if self.discovery_phase == DiscoveryPhase.RUNNING:
-            self.discovery_phase = DiscoveryPhase.JOINING
+        if self.discovery_phase is RUNNING:
+            self.discovery_phase = JOINING
             print("Triggered joining discovery phase")
 
 # Enhanced client discovery with retry mechanism
 class ClientDiscovery:
     """Client discovery with retry and timeout mechanisms"""
     
-    def __init__(self, client_id: str, max_retries: int = 3, timeout: int = 5):
+    def __init__(self, client_id: str, max_retries: int = MAX_RETRY_ATTEMPTS, timeout: int = DISCOVERY_TIMEOUT):
         self.client_id = client_id
         self.max_retries = max_retries
         self.timeout = timeout
         self.discovery_attempts = 0
+        self._join_msg = JOIN_PREFIX + client_id.encode()
+        self._sock = None  # Created on first discovery, kept for reconnections
+        
+    def _socket(self) -> socket.socket:
+        """Get the discovery socket, discarding replies left over from an earlier discovery"""
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.settimeout(self.timeout)
+            return self._sock
+        self._sock.setblocking(False)
+        try:
+            while True:
+                self._sock.recv(1024)
+        except OSError:
+            pass
+        self._sock.settimeout(self.timeout)
+        return self._sock
+    
+    def close(self):
+        """Release the discovery socket"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
         
     def discover_servers(self) -> Optional[str]:
         """Discover servers with retry mechanism"""
+        # One socket for all attempts; a late reply to an earlier join still counts
+        sock = self._socket()
         for attempt in range(self.max_retries):
             self.discovery_attempts += 1
             print(f"Client {self.client_id}: Discovery attempt {attempt + 1}/{self.max_retries}")
             
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock.settimeout(self.timeout)
-                
                 # Send join message
-                join_msg = f"join:{self.client_id}"
-                sock.sendto(join_msg.encode(), MULTICAST_GROUP_ADDRESS)
+                sock.sendto(self._join_msg, MULTICAST_GROUP_ADDRESS)
                 
                 # Wait for response
                 response, server_addr = sock.recvfrom(1024)
-                sock.close()
                 
                 print(f"Client {self.client_id}: Connected to server at {server_addr}")
                 return response.decode()
                 
             except socket.timeout:
                 print(f"Client {self.client_id}: Discovery attempt {attempt + 1} timed out")
-                if attempt < self.max_retries - 1:
-                    time.sleep(2)  # Wait before retry
-                    
+                
             except Exception as e:
                 print(f"Client {self.client_id}: Discovery attempt {attempt + 1} failed: {e}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(2)  # Wait before retry
+            
+            if attempt < self.max_retries - 1:
+                time.sleep(backoff_delay(attempt))  # Jittered backoff before retry
         
         print(f"Client {self.client_id}: Failed to discover servers after {self.max_retries} attempts")
         return None
\ No newline at end of file
@@ -1,18 +1,43 @@
-import socket
+import heapq
+import itertools
 import threading
 import time
 import json
 import hashlib
+import random
+import socket
 import uuid
 import logging
-from typing import Dict, Set, Optional, Callable, Any, Tuple
-from collections import defaultdict, deque
-from resources.utils import MULTICAST_GROUP_ADDRESS, group_view_servers, current_leader
+from typing import Dict, List, Set, Optional, Callable, Any, Tuple
+from collections import OrderedDict, defaultdict, deque
+from resources.net_batch import sendmmsg
+from resources.utils import MULTICAST_GROUP_ADDRESS, group_view_servers, current_leader, create_multicast_socket
+
+# orjson when available (it emits bytes directly); the output is plain JSON either
+# way, so nodes with and without it interoperate
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    
+    _loads = json.loads
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Periodic tasks wait their interval +/- this fraction so nodes drift out of lockstep
+INTERVAL_JITTER = 0.1
+
+def _jittered(seconds: float) -> float:
+    return seconds * random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER)
+
 class MessageType:
     """Message types for fault tolerance"""
     HEARTBEAT = "HEARTBEAT"
@@ -32,21 +57,26 @@ class FaultType:
 
 class ReliableMessage:
     """Reliable message with sequence number and acknowledgment"""
-    def __init__(self, sender_id: str, msg_type: str, payload: Any, msg_id: str = None):
+    MAX_RETRIES = 3
+    
+    def __init__(self, sender_id: str, msg_type: str, payload: Any, msg_id: str = None,
+                 _skip_checksum: bool = False):
         self.msg_id = msg_id or str(uuid.uuid4())
         self.sender_id = sender_id
         self.msg_type = msg_type
         self.payload = payload
         self.timestamp = time.time()
         self.sequence_num = 0
-        self.checksum = self._calculate_checksum()
+        # from_dict overwrites the checksum with the received one, so it skips computing it here
+        self.checksum = None if _skip_checksum else self._calculate_checksum()
         self.retry_count = 0
-        self.max_retries = 3
+        self.max_retries = self.MAX_RETRIES
+        self._wire: Optional[bytes] = None
         
     def _calculate_checksum(self) -> str:
         """Calculate message checksum for integrity"""
-        data = f"{self.sender_id}{self.msg_type}{str(self.payload)}{self.timestamp}"
-        return hashlib.sha256(data.encode()).hexdigest()[:16]
+        data = f"{self.sender_id}{self.msg_type}{self.payload}{self.timestamp}"
+        return hashlib.blake2b(data.encode(), digest_size=8).hexdigest()  # 64-bit, for corruption not adversaries
     
     def verify_integrity(self) -> bool:
         """Verify message integrity"""
@@ -65,10 +95,25 @@ class ReliableMessage:
             'checksum': self.checksum
         }
     
+    def to_wire(self, target_nodes: Set[str] = None) -> bytes:
+        """
+        Serialize as a RELIABLE_MSG envelope.
+        
+        Built on the first call and reused after that, so retries resend the
+        original bytes: the same timestamp, checksum and target nodes.
+        """
+        if self._wire is None:
+            self._wire = _dumps({
+                'type': MessageType.RELIABLE_MSG,
+                'message': self.to_dict(),
+                'target_nodes': list(target_nodes) if target_nodes else None
+            })
+        return self._wire
+    
     @classmethod
     def from_dict(cls, data: Dict):
         """Create from dictionary"""
-        msg = cls(data['sender_id'], data['msg_type'], data['payload'], data['msg_id'])
+        msg = cls(data['sender_id'], data['msg_type'], data['payload'], data['msg_id'], _skip_checksum=True)
         msg.timestamp = data['timestamp']
         msg.sequence_num = data['sequence_num']
         msg.checksum = data['checksum']
@@ -76,7 +121,7 @@ class ReliableMessage:
 
 class PartitionDetector:
     """Network partition detection and recovery"""
-    def __init__(self, node_id: str, probe_interval: int = 10):
+    def __init__(self, node_id: str, probe_interval: int = 10, grace_period: float = 30):
         self.node_id = node_id
         self.probe_interval = probe_interval
         self.known_nodes: Set[str] = set()
@@ -84,19 +129,50 @@ class PartitionDetector:
         self.partition_start_time: Optional[float] = None
         self.in_partition = False
         self.probe_responses: Dict[str, float] = {}
+        # Per-node callbacks for 'node_reachable' / 'node_unreachable' transitions
+        self.transition_callbacks: Dict[str, Callable[[str], None]] = {}
+        
+        # Don't declare partitions while the cluster is still forming; once the
+        # deadline passes the flag flips and the clock is never read again
+        self.partition_detection_enabled = False
+        self._grace_deadline = time.monotonic() + grace_period
+        
+        # Probes wait for their replies on this socket, kept for the detector's lifetime
+        self.probe_timeout = 2  # seconds, shared by every probe in a round
+        self._probe_sock = create_multicast_socket()
         
     def add_known_node(self, node_id: str):
         """Add a node to the known nodes list"""
         self.known_nodes.add(node_id)
+    
+    def add_transition_callback(self, event_type: str, callback: Callable[[str], None]):
+        """Call back with a node ID when it becomes reachable ('node_reachable') or not ('node_unreachable')"""
+        self.transition_callbacks[event_type] = callback
+    
+    def close(self):
+        """Release the probe socket"""
+        self._probe_sock.close()
         
     def probe_nodes(self) -> bool:
         """Probe all known nodes to detect partitions"""
-        self.reachable_nodes.clear()
+        if not self.partition_detection_enabled:
+            if time.monotonic() < self._grace_deadline:
+                return True  # Still in the startup grace period
+            self.partition_detection_enabled = True
         
-        for node_id in self.known_nodes:
-            if self._probe_node(node_id):
-                self.reachable_nodes.add(node_id)
-                self.probe_responses[node_id] = time.time()
+        # All probes go out together, so one timeout bounds the whole round
+        targets = set(self.known_nodes)
+        now_reachable = self._probe_all(targets) if targets else set()
+        now = time.time()
+        for node_id in now_reachable:
+            self.probe_responses[node_id] = now
+        
+        # Diff against the previous round so callbacks see only actual transitions
+        came_back = now_reachable - self.reachable_nodes
+        went_away = self.reachable_nodes - now_reachable
+        self.reachable_nodes = now_reachable
+        self._notify_transitions('node_reachable', came_back)
+        self._notify_transitions('node_unreachable', went_away)
         
         # Check if we're in a partition
         total_nodes = len(self.known_nodes)
@@ -109,72 +185,142 @@ class PartitionDetector:
             
             if self.in_partition and not was_in_partition:
                 self.partition_start_time = time.time()
-                logger.warning(f"Partition detected! Reachable: {reachable_nodes}/{total_nodes}")
+                logger.warning("Partition detected! Reachable: %s/%s", reachable_nodes, total_nodes)
             elif not self.in_partition and was_in_partition:
-                logger.info(f"Partition healed! Reachable: {reachable_nodes}/{total_nodes}")
+                logger.info("Partition healed! Reachable: %s/%s", reachable_nodes, total_nodes)
                 self.partition_start_time = None
         
         return not self.in_partition
     
-    def _probe_node(self, node_id: str) -> bool:
-        """Probe a specific node"""
+    def _notify_transitions(self, event_type: str, node_ids: Set[str]):
+        """Run the callback for event_type once per node"""
+        callback = self.transition_callbacks.get(event_type)
+        if callback is None:
+            return
+        for node_id in node_ids:
+            try:
+                callback(node_id)
+            except Exception as e:
+                logger.error("Error in %s callback for %s: %s", event_type, node_id, e)
+    
+    def _probe_all(self, node_ids: Set[str]) -> Set[str]:
+        """Probe several nodes at once and return those that answered within the timeout"""
+        reachable = set()
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock.settimeout(2)
-            
-            probe_msg = {
+            now = time.time()
+            probes = [(_dumps({
                 'type': MessageType.PARTITION_PROBE,
                 'sender_id': self.node_id,
                 'target_id': node_id,
-                'timestamp': time.time()
-            }
+                'timestamp': now
+            }), MULTICAST_GROUP_ADDRESS) for node_id in node_ids]
+            sendmmsg(self._probe_sock, probes)
             
-            sock.sendto(json.dumps(probe_msg).encode(), MULTICAST_GROUP_ADDRESS)
-            
-            # Wait for response
-            response, addr = sock.recvfrom(1024)
-            response_data = json.loads(response.decode())
-            
-            if (response_data.get('type') == MessageType.PARTITION_PROBE and 
-                response_data.get('target_id') == self.node_id):
-                return True
+            # Collect responses until every node has answered or the shared timeout expires
+            deadline = time.monotonic() + self.probe_timeout
+            while len(reachable) < len(node_ids):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._probe_sock.settimeout(remaining)
+                response, addr = self._probe_sock.recvfrom(1024)
+                try:
+                    response_data = _loads(response)
+                except ValueError:
+                    continue  # Not a probe response
+                if not isinstance(response_data, dict):
+                    continue  # Valid JSON, but not a message object
                 
+                sender_id = response_data.get('sender_id')
+                if (response_data.get('type') == MessageType.PARTITION_PROBE and
+                        response_data.get('target_id') == self.node_id and sender_id in node_ids):
+                    reachable.add(sender_id)
+                    
+        except socket.timeout:
+            pass
         except Exception as e:
-            logger.debug(f"Failed to probe node {node_id}: {e}")
-        finally:
-            sock.close()
+            logger.debug("Failed to probe nodes: %s", e)
         
-        return False
+        return reachable
 
 class FaultToleranceManager:
     """Comprehensive fault tolerance manager"""
     
-    def __init__(self, node_id: str, node_type: str = "server"):
+    # Tunable intervals, configured in milliseconds and stored as seconds
+    INTERVAL_SETTINGS = ('heartbeat_interval_ms', 'failure_timeout_ms', 'message_timeout_ms',
+                         'leader_timeout_ms', 'probe_interval_ms')
+    
+    RETRY_CHECK_INTERVAL = 2  # seconds between passes of the retry tick
+    DEDUP_WINDOW_MARGIN = 5  # extra seconds remembered, for senders with a longer message_timeout
+    
+    def __init__(self, node_id: str, node_type: str = "server", heartbeat_interval_ms: int = 1000,
+                 failure_timeout_ms: int = 5000, message_timeout_ms: int = 5000,
+                 leader_timeout_ms: int = 10000, probe_interval_ms: int = 10000):
         self.node_id = node_id
         self.node_type = node_type
         
         # Message reliability
         self.pending_messages: Dict[str, ReliableMessage] = {}
-        self.received_messages: Set[str] = set()
+        self._pending_lock = threading.Lock()  # Sends, ACKs and the retry loop all touch pending_messages
+        # Recent message IDs -> time.monotonic() of arrival, oldest first. Only
+        # retries can repeat an ID, so entries older than the senders' retry
+        # window are dropped; the size cap covers bursts within the window
+        self.received_messages: Dict[str, float] = OrderedDict()
+        self.max_received_messages = 100000
         self.sequence_counter = 0
-        self.message_timeout = 5  # seconds
+        self.message_timeout = message_timeout_ms / 1000  # seconds
+        self._pending_heap: List[Tuple[float, str]] = []  # (retry deadline, msg_id), under _pending_lock
         
         # Failure detection
-        self.heartbeat_interval = 5  # seconds
-        self.failure_timeout = 15  # seconds
-        self.node_last_seen: Dict[str, float] = {}
+        self.heartbeat_interval = heartbeat_interval_ms / 1000  # seconds
+        self.failure_timeout = failure_timeout_ms / 1000  # seconds
+        self.node_last_seen: Dict[str, float] = {}  # time.monotonic() of each node's last heartbeat
         self.failed_nodes: Set[str] = set()
+        # One (expiry, node_id) entry per live node; the entry is pushed back on
+        # expiry if the node has been seen since, so checks only touch due nodes
+        self._liveness_heap: List[Tuple[float, str]] = []
+        self._liveness_lock = threading.Lock()
+        
+        # Heartbeats are fixed apart from their trailing timestamp: serialize the
+        # rest once and leave the object open for "timestamp"
+        self._heartbeat_prefix = _dumps({
+            'type': MessageType.HEARTBEAT,
+            'sender_id': node_id,
+            'node_type': node_type
+        })[:-1] + b',"timestamp":'
+        self._leader_heartbeat_prefix = _dumps({
+            'type': MessageType.LEADER_HEARTBEAT,
+            'sender_id': node_id
+        })[:-1] + b',"timestamp":'
         
         # Partition detection
-        self.partition_detector = PartitionDetector(node_id)
+        self.partition_detector = PartitionDetector(node_id, probe_interval_ms / 1000)
+        
+        # Fault tolerance message handlers, keyed on the message's 'type'
+        self._handlers: Dict[str, Callable[[Dict, Tuple[str, int]], Optional[Dict]]] = {
+            MessageType.HEARTBEAT: self._handle_heartbeat,
+            MessageType.ACK: self._handle_acknowledgment,
+            MessageType.RELIABLE_MSG: self._handle_reliable_message,
+            MessageType.LEADER_HEARTBEAT: self._handle_leader_heartbeat,
+            MessageType.PARTITION_PROBE: self._handle_partition_probe,
+        }
         
         # Recovery mechanisms
         self.recovery_callbacks: Dict[str, Callable] = {}
         self.state_backup: Dict[str, Any] = {}
         
-        # Threading
+        # Threading: one reactor thread runs the periodic tasks from a heap of
+        # (deadline, seq, task); partition probes block on replies, so they keep
+        # their own thread. The stop event doubles as both threads' sleep
         self.running = False
         self.threads: Dict[str, threading.Thread] = {}
+        self._stop = threading.Event()
+        self._timers = []
+        self._timer_seq = itertools.count()
+        
+        # Every outgoing heartbeat, ACK and message shares one socket
+        self._tx_sock = create_multicast_socket()
+        self._tx_lock = threading.Lock()
         
         # Statistics
         self.fault_stats = {
@@ -185,8 +331,8 @@ class FaultToleranceManager:
         }
         
         # Leader monitoring (for servers)
-        self.leader_last_seen: Optional[float] = None
-        self.leader_timeout = 10  # seconds
+        self.leader_last_seen: Optional[float] = None  # time.monotonic()
+        self.leader_timeout = leader_timeout_ms / 1000  # seconds
         
     def start(self):
         """Start fault tolerance mechanisms"""
@@ -194,75 +340,94 @@ class FaultToleranceManager:
             return
             
         self.running = True
-        logger.info(f"Starting fault tolerance for {self.node_type} {self.node_id}")
+        logger.info("Starting fault tolerance for %s %s", self.node_type, self.node_id)
+        
+        # Every periodic task is due immediately, then reschedules itself
+        tasks = [self._heartbeat_tick, self._failure_detection_tick, self._message_timeout_tick]
+        if self.node_type == "server":
+            tasks.append(self._leader_monitoring_tick)
+        now = time.monotonic()
+        self._stop.clear()
+        self._timers = [(now, next(self._timer_seq), task) for task in tasks]
+        heapq.heapify(self._timers)
         
         # Start threads
-        self.threads['heartbeat'] = threading.Thread(target=self._heartbeat_loop, daemon=True)
-        self.threads['failure_detector'] = threading.Thread(target=self._failure_detection_loop, daemon=True)
-        self.threads['message_timeout'] = threading.Thread(target=self._message_timeout_loop, daemon=True)
+        self.threads['reactor'] = threading.Thread(target=self._reactor, daemon=True)
         self.threads['partition_detector'] = threading.Thread(target=self._partition_detection_loop, daemon=True)
         
-        if self.node_type == "server":
-            self.threads['leader_monitor'] = threading.Thread(target=self._leader_monitoring_loop, daemon=True)
-        
         for thread in self.threads.values():
             thread.start()
     
     def stop(self):
         """Stop fault tolerance mechanisms"""
         self.running = False
+        self._stop.set()
         for thread in self.threads.values():
             thread.join(timeout=1)
-        logger.info(f"Stopped fault tolerance for {self.node_id}")
+        self._tx_sock.close()
+        self.partition_detector.close()
+        logger.info("Stopped fault tolerance for %s", self.node_id)
     
     def send_reliable_message(self, msg_type: str, payload: Any, target_nodes: Set[str] = None) -> str:
         """Send a reliable message with acknowledgment"""
         message = ReliableMessage(self.node_id, msg_type, payload)
         message.sequence_num = self._get_next_sequence()
         
-        self.pending_messages[message.msg_id] = message
+        with self._pending_lock:
+            self.pending_messages[message.msg_id] = message
+            heapq.heappush(self._pending_heap, (time.monotonic() + self.message_timeout, message.msg_id))
         
         # Send message
         self._transmit_message(message, target_nodes)
         
-        logger.debug(f"Sent reliable message {message.msg_id} type {msg_type}")
+        logger.debug("Sent reliable message %s type %s", message.msg_id, msg_type)
         return message.msg_id
     
     def handle_message(self, raw_message: str, sender_addr: Tuple[str, int]) -> Optional[Dict]:
         """Handle incoming message with fault tolerance"""
         try:
-            data = json.loads(raw_message)
+            data = _loads(raw_message)
             
             # Handle different message types
             msg_type = data.get('type', '')
             
-            if msg_type == MessageType.HEARTBEAT:
-                return self._handle_heartbeat(data, sender_addr)
-            elif msg_type == MessageType.ACK:
-                return self._handle_acknowledgment(data)
-            elif msg_type == MessageType.RELIABLE_MSG:
-                return self._handle_reliable_message(data, sender_addr)
-            elif msg_type == MessageType.LEADER_HEARTBEAT:
-                return self._handle_leader_heartbeat(data)
-            elif msg_type == MessageType.PARTITION_PROBE:
-                return self._handle_partition_probe(data, sender_addr)
+            handler = self._handlers.get(msg_type)
+            if handler:
+                return handler(data, sender_addr)
             else:
                 # Regular message - add basic validation
                 if self._validate_message(data):
                     return data
                 else:
-                    logger.warning(f"Invalid message from {sender_addr}: {data}")
+                    logger.warning("Invalid message from %s: %s", sender_addr, data)
                     self.fault_stats[FaultType.BYZANTINE] += 1
                     
-        except json.JSONDecodeError:
-            logger.warning(f"Corrupted message from {sender_addr}: {raw_message}")
+        except json.JSONDecodeError:  # orjson's decode error subclasses it
+            logger.warning("Corrupted message from %s: %s", sender_addr, raw_message)
             self.fault_stats[FaultType.BYZANTINE] += 1
         except Exception as e:
-            logger.error(f"Error handling message from {sender_addr}: {e}")
+            logger.error("Error handling message from %s: %s", sender_addr, e)
             self.fault_stats[FaultType.OMISSION] += 1
         
         return None
     
+    def update_intervals(self, **intervals_ms: int):
+        """
+        Retune intervals while running, e.g. update_intervals(heartbeat_interval_ms=500).
+        
+        Each periodic task picks up its new interval when it next reschedules.
+        """
+        unknown = set(intervals_ms) - set(self.INTERVAL_SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown interval settings: {', '.join(sorted(unknown))}")
+        
+        for name, value in intervals_ms.items():
+            seconds = value / 1000
+            if name == 'probe_interval_ms':
+                self.partition_detector.probe_interval = seconds
+            else:
+                setattr(self, name[:-len('_ms')], seconds)
+    
     def register_recovery_callback(self, fault_type: str, callback: Callable):
         """Register recovery callback for fault type"""
         self.recovery_callbacks[fault_type] = callback
@@ -285,29 +450,45 @@ class FaultToleranceManager:
         self.sequence_counter += 1
         return self.sequence_counter
     
+    def _send(self, *messages: Dict):
+        """Send messages to the multicast group on the shared socket, several per sendmmsg call"""
+        self._send_raw(*(_dumps(data) for data in messages))
+    
+    def _send_raw(self, *payloads: bytes):
+        """Send already serialized messages to the multicast group"""
+        batch = [(payload, MULTICAST_GROUP_ADDRESS) for payload in payloads]
+        with self._tx_lock:
+            sendmmsg(self._tx_sock, batch)
+    
     def _transmit_message(self, message: ReliableMessage, target_nodes: Set[str] = None):
         """Transmit message over network"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            
-            msg_data = {
-                'type': MessageType.RELIABLE_MSG,
-                'message': message.to_dict(),
-                'target_nodes': list(target_nodes) if target_nodes else None
-            }
-            
-            sock.sendto(json.dumps(msg_data).encode(), MULTICAST_GROUP_ADDRESS)
-            sock.close()
+            self._send_raw(message.to_wire(target_nodes))
             
         except Exception as e:
-            logger.error(f"Failed to transmit message {message.msg_id}: {e}")
+            logger.error("Failed to transmit message %s: %s", message.msg_id, e)
             self.fault_stats[FaultType.OMISSION] += 1
     
+    def _retransmit_messages(self, messages: List[ReliableMessage]):
+        """Resend timed-out messages in one batch"""
+        try:
+            self._send_raw(*(message.to_wire() for message in messages))
+            for message in messages:
+                logger.debug("Retrying message %s (attempt %s)", message.msg_id, message.retry_count)
+            
+        except Exception as e:
+            logger.error("Failed to retransmit %s messages: %s", len(messages), e)
+            self.fault_stats[FaultType.OMISSION] += len(messages)
+    
     def _handle_heartbeat(self, data: Dict, sender_addr: Tuple[str, int]) -> Dict:
         """Handle heartbeat message"""
         sender_id = data.get('sender_id')
         if sender_id:
-            self.node_last_seen[sender_id] = time.time()
+            now = time.monotonic()
+            with self._liveness_lock:
+                if sender_id not in self.node_last_seen or sender_id in self.failed_nodes:
+                    heapq.heappush(self._liveness_heap, (now + self.failure_timeout, sender_id))
+                self.node_last_seen[sender_id] = now
             self.partition_detector.add_known_node(sender_id)
             
             # Remove from failed nodes if it was there
@@ -315,12 +496,13 @@ class FaultToleranceManager:
         
         return {'type': 'heartbeat_ack', 'sender_id': self.node_id}
     
-    def _handle_acknowledgment(self, data: Dict) -> None:
+    def _handle_acknowledgment(self, data: Dict, sender_addr: Tuple[str, int] = None) -> None:
         """Handle message acknowledgment"""
         msg_id = data.get('msg_id')
-        if msg_id and msg_id in self.pending_messages:
-            del self.pending_messages[msg_id]
-            logger.debug(f"Received ACK for message {msg_id}")
+        with self._pending_lock:
+            acked = self.pending_messages.pop(msg_id, None)
+        if acked:
+            logger.debug("Received ACK for message %s", msg_id)
     
     def _handle_reliable_message(self, data: Dict, sender_addr: Tuple[str, int]) -> Optional[Dict]:
         """Handle reliable message"""
@@ -330,24 +512,24 @@ class FaultToleranceManager:
             
             # Check for duplicate
             if message.msg_id in self.received_messages:
-                logger.debug(f"Duplicate message {message.msg_id} from {message.sender_id}")
+                logger.debug("Duplicate message %s from %s", message.msg_id, message.sender_id)
                 # Send ACK anyway
                 self._send_ack(message.msg_id, sender_addr)
                 return None
             
             # Verify integrity
             if not message.verify_integrity():
-                logger.warning(f"Message integrity check failed for {message.msg_id}")
+                logger.warning("Message integrity check failed for %s", message.msg_id)
                 self.fault_stats[FaultType.BYZANTINE] += 1
                 return None
             
             # Mark as received
-            self.received_messages.add(message.msg_id)
+            self._remember_received(message.msg_id)
             
             # Send acknowledgment
             self._send_ack(message.msg_id, sender_addr)
             
-            logger.debug(f"Received reliable message {message.msg_id} from {message.sender_id}")
+            logger.debug("Received reliable message %s from %s", message.msg_id, message.sender_id)
             return {
                 'type': 'reliable_message',
                 'message': message,
@@ -355,16 +537,32 @@ class FaultToleranceManager:
             }
             
         except Exception as e:
-            logger.error(f"Error handling reliable message: {e}")
+            logger.error("Error handling reliable message: %s", e)
             self.fault_stats[FaultType.OMISSION] += 1
             return None
     
-    def _handle_leader_heartbeat(self, data: Dict) -> None:
+    def _remember_received(self, msg_id: str):
+        """Record a message ID for duplicate detection, forgetting IDs that can no longer repeat"""
+        now = time.monotonic()
+        received = self.received_messages
+        received[msg_id] = now
+        
+        # The first send plus max_retries resends, each message_timeout apart plus
+        # up to one (jittered) retry tick late
+        retry_gap = self.message_timeout + self.RETRY_CHECK_INTERVAL * (1 + INTERVAL_JITTER)
+        horizon = now - retry_gap * (ReliableMessage.MAX_RETRIES + 1) - self.DEDUP_WINDOW_MARGIN
+        while received:
+            oldest_id = next(iter(received))
+            if received[oldest_id] >= horizon and len(received) <= self.max_received_messages:
+                break
+            received.popitem(last=False)
+    
+    def _handle_leader_heartbeat(self, data: Dict, sender_addr: Tuple[str, int] = None) -> None:
         """Handle leader heartbeat"""
         leader_id = data.get('sender_id')
         if leader_id == current_leader:
-            self.leader_last_seen = time.time()
-            logger.debug(f"Received leader heartbeat from {leader_id}")
+            self.leader_last_seen = time.monotonic()
+            logger.debug("Received leader heartbeat from %s", leader_id)
     
     def _handle_partition_probe(self, data: Dict, sender_addr: Tuple[str, int]) -> Dict:
         """Handle partition probe"""
@@ -386,104 +584,105 @@ class FaultToleranceManager:
     def _send_ack(self, msg_id: str, sender_addr: Tuple[str, int]):
         """Send acknowledgment"""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             ack_data = {
                 'type': MessageType.ACK,
                 'msg_id': msg_id,
                 'sender_id': self.node_id
             }
-            sock.sendto(json.dumps(ack_data).encode(), MULTICAST_GROUP_ADDRESS)
-            sock.close()
+            self._send(ack_data)
             
         except Exception as e:
-            logger.error(f"Failed to send ACK for {msg_id}: {e}")
+            logger.error("Failed to send ACK for %s: %s", msg_id, e)
     
     def _validate_message(self, data: Dict) -> bool:
         """Basic message validation"""
         required_fields = ['type', 'sender_id']
         return all(field in data for field in required_fields)
     
-    def _heartbeat_loop(self):
-        """Send periodic heartbeats"""
-        while self.running:
+    def _reactor(self):
+        """Run each periodic task when it falls due; waits on the stop event in between"""
+        while self._timers:
+            deadline, _, task = self._timers[0]
+            if self._stop.wait(max(0, deadline - time.monotonic())):
+                return
+            heapq.heappop(self._timers)
             try:
-                heartbeat_data = {
-                    'type': MessageType.HEARTBEAT,
-                    'sender_id': self.node_id,
-                    'node_type': self.node_type,
-                    'timestamp': time.time()
-                }
-                
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock.sendto(json.dumps(heartbeat_data).encode(), MULTICAST_GROUP_ADDRESS)
-                sock.close()
-                
-                # Send leader heartbeat if we're the leader
-                if self.node_type == "server" and current_leader == int(self.node_id):
-                    leader_heartbeat = {
-                        'type': MessageType.LEADER_HEARTBEAT,
-                        'sender_id': self.node_id,
-                        'timestamp': time.time()
-                    }
-                    
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                    sock.sendto(json.dumps(leader_heartbeat).encode(), MULTICAST_GROUP_ADDRESS)
-                    sock.close()
-                
-                time.sleep(self.heartbeat_interval)
-                
+                delay = task()
             except Exception as e:
-                logger.error(f"Error in heartbeat loop: {e}")
-                time.sleep(self.heartbeat_interval)
+                logger.error("Error in %s: %s", task.__name__, e)
+                delay = 1  # Retry the failing task shortly
+            heapq.heappush(self._timers, (time.monotonic() + _jittered(delay), next(self._timer_seq), task))
     
-    def _failure_detection_loop(self):
+    def _heartbeat_tick(self) -> float:
+        """Send a heartbeat"""
+        # Only the timestamp changes, so it is spliced onto the pre-serialized prefix
+        timestamp = repr(time.time()).encode()
+        heartbeats = [self._heartbeat_prefix + timestamp + b"}"]
+        
+        # Send leader heartbeat if we're the leader
+        if self.node_type == "server" and current_leader == int(self.node_id):
+            heartbeats.append(self._leader_heartbeat_prefix + timestamp + b"}")
+        
+        self._send_raw(*heartbeats)  # Both heartbeats leave in one syscall
+        return self.heartbeat_interval
+    
+    def _failure_detection_tick(self) -> float:
         """Detect node failures"""
-        while self.running:
-            current_time = time.time()
-            newly_failed = set()
-            
-            for node_id, last_seen in list(self.node_last_seen.items()):
-                if current_time - last_seen > self.failure_timeout:
-                    if node_id not in self.failed_nodes:
-                        newly_failed.add(node_id)
-                        self.failed_nodes.add(node_id)
-                        self.fault_stats[FaultType.CRASH] += 1
-                        logger.warning(f"Node {node_id} failed (timeout)")
-                        
-                        # Trigger recovery callback
-                        if FaultType.CRASH in self.recovery_callbacks:
-                            try:
-                                self.recovery_callbacks[FaultType.CRASH](node_id)
-                            except Exception as e:
-                                logger.error(f"Error in crash recovery callback: {e}")
+        current_time = time.monotonic()
+        newly_failed = []
+        
+        with self._liveness_lock:
+            heap = self._liveness_heap
+            while heap and heap[0][0] < current_time:
+                _, node_id = heapq.heappop(heap)
+                expiry = self.node_last_seen[node_id] + self.failure_timeout
+                if expiry >= current_time:
+                    heapq.heappush(heap, (expiry, node_id))  # Seen since; check again later
+                elif node_id not in self.failed_nodes:
+                    newly_failed.append(node_id)
+                    self.failed_nodes.add(node_id)
+        
+        for node_id in newly_failed:
+            self.fault_stats[FaultType.CRASH] += 1
+            logger.warning("Node %s failed (timeout)", node_id)
             
-            time.sleep(5)  # Check every 5 seconds
+            # Trigger recovery callback
+            if FaultType.CRASH in self.recovery_callbacks:
+                try:
+                    self.recovery_callbacks[FaultType.CRASH](node_id)
+                except Exception as e:
+                    logger.error("Error in crash recovery callback: %s", e)
+        
+        return self.failure_timeout / 3  # Check a few times per timeout
     
-    def _message_timeout_loop(self):
+    def _message_timeout_tick(self) -> float:
         """Handle message timeouts and retries"""
-        while self.running:
-            current_time = time.time()
-            timed_out_messages = []
-            
-            for msg_id, message in list(self.pending_messages.items()):
-                if current_time - message.timestamp > self.message_timeout:
-                    if message.retry_count < message.max_retries:
-                        # Retry message
-                        message.retry_count += 1
-                        message.timestamp = current_time
-                        self._transmit_message(message)
-                        logger.debug(f"Retrying message {msg_id} (attempt {message.retry_count})")
-                    else:
-                        # Message failed
-                        timed_out_messages.append(msg_id)
-                        self.fault_stats[FaultType.OMISSION] += 1
-                        logger.warning(f"Message {msg_id} failed after {message.max_retries} retries")
-            
-            # Remove failed messages
-            for msg_id in timed_out_messages:
-                del self.pending_messages[msg_id]
-            
-            time.sleep(2)  # Check every 2 seconds
+        current_time = time.monotonic()
+        retries = []
+        
+        with self._pending_lock:
+            heap = self._pending_heap
+            while heap and heap[0][0] < current_time:
+                _, msg_id = heapq.heappop(heap)
+                message = self.pending_messages.get(msg_id)
+                if message is None:
+                    continue  # Acknowledged since it was scheduled
+                if message.retry_count < message.max_retries:
+                    # Retry message
+                    message.retry_count += 1
+                    heapq.heappush(heap, (current_time + self.message_timeout, msg_id))
+                    retries.append(message)
+                else:
+                    # Message failed
+                    del self.pending_messages[msg_id]
+                    self.fault_stats[FaultType.OMISSION] += 1
+                    logger.warning("Message %s failed after %s retries", msg_id, message.max_retries)
+        
+        # Retransmit outside the lock so ACKs aren't held up by the sends
+        if retries:
+            self._retransmit_messages(retries)
+        
+        return self.RETRY_CHECK_INTERVAL
     
     def _partition_detection_loop(self):
         """Detect network partitions"""
@@ -499,29 +698,27 @@ class FaultToleranceManager:
                         try:
                             self.recovery_callbacks[FaultType.PARTITION](self.partition_detector)
                         except Exception as e:
-                            logger.error(f"Error in partition recovery callback: {e}")
-                
-                time.sleep(self.partition_detector.probe_interval)
+                            logger.error("Error in partition recovery callback: %s", e)
                 
             except Exception as e:
-                logger.error(f"Error in partition detection: {e}")
-                time.sleep(self.partition_detector.probe_interval)
+                logger.error("Error in partition detection: %s", e)
+            
+            self._stop.wait(_jittered(self.partition_detector.probe_interval))
     
-    def _leader_monitoring_loop(self):
+    def _leader_monitoring_tick(self) -> float:
         """Monitor leader health (for servers)"""
-        while self.running:
-            if current_leader and self.leader_last_seen:
-                if time.time() - self.leader_last_seen > self.leader_timeout:
-                    logger.warning(f"Leader {current_leader} heartbeat timeout")
-                    
-                    # Trigger leader failure recovery
-                    if FaultType.CRASH in self.recovery_callbacks:
-                        try:
-                            self.recovery_callbacks[FaultType.CRASH](current_leader)
-                        except Exception as e:
-                            logger.error(f"Error in leader failure recovery: {e}")
-            
-            time.sleep(self.leader_timeout / 2)
+        if current_leader and self.leader_last_seen:
+            if time.monotonic() - self.leader_last_seen > self.leader_timeout:
+                logger.warning("Leader %s heartbeat timeout", current_leader)
+                
+                # Trigger leader failure recovery
+                if FaultType.CRASH in self.recovery_callbacks:
+                    try:
+                        self.recovery_callbacks[FaultType.CRASH](current_leader)
+                    except Exception as e:
+                        logger.error("Error in leader failure recovery: %s", e)
+        
+        return self.leader_timeout / 2
     
     def get_fault_statistics(self) -> Dict:
         """Get fault tolerance statistics"""
@@ -543,10 +740,10 @@ class FaultToleranceManager:
 # Global fault tolerance manager
 fault_tolerance_manager: Optional[FaultToleranceManager] = None
 
-def initialize_fault_tolerance(node_id: str, node_type: str = "server") -> FaultToleranceManager:
-    """Initialize global fault tolerance manager"""
+def initialize_fault_tolerance(node_id: str, node_type: str = "server", **intervals_ms: int) -> FaultToleranceManager:
+    """Initialize global fault tolerance manager; intervals_ms are passed to FaultToleranceManager"""
     global fault_tolerance_manager
-    fault_tolerance_manager = FaultToleranceManager(node_id, node_type)
+    fault_tolerance_manager = FaultToleranceManager(node_id, node_type, **intervals_ms)
     return fault_tolerance_manager
 
 def get_fault_tolerance_manager() -> Optional[FaultToleranceManager]:
@@ -1,41 +1,126 @@
 import time
+import heapq
+import queue
 import threading
-from typing import Dict, Set, List, Optional, Tuple
-from resources.utils import group_view_servers, group_view_clients, server_last_seen, current_leader
+from contextlib import contextmanager, nullcontext
+from types import MappingProxyType
+from typing import Dict, Iterable, Set, List, Mapping, Optional, Tuple
+from resources.utils import group_view_servers, group_view_clients, server_last_seen, current_leader, safe_print
+
+# How often the cleanup thread refreshes the coarse clock (seconds)
+CLOCK_RESOLUTION = 0.2
+
+# How long a computed system status may be served from cache (seconds)
+STATUS_CACHE_TTL = 0.5
+
+# Number of lock stripes guarding per-participant state (must be a power of two)
+NUM_SHARDS = 16
+
+_coarse_now = time.monotonic()
+_tickers = 0  # Running group views whose cleanup thread refreshes _coarse_now
+_tickers_lock = threading.Lock()
+
+class CoarseClock:
+    """
+    Monotonic clock refreshed periodically by the group view cleanup thread.
+    
+    While no cleanup thread is running nothing refreshes the cached value,
+    so reads fall through to time.monotonic() instead.
+    """
+    
+    @staticmethod
+    def now() -> float:
+        """Get the cached monotonic time"""
+        return _coarse_now if _tickers else time.monotonic()
+    
+    @staticmethod
+    def tick() -> float:
+        """Refresh the cached monotonic time"""
+        global _coarse_now
+        _coarse_now = time.monotonic()
+        return _coarse_now
+    
+    @staticmethod
+    def add_ticker():
+        """Register a thread that will call tick() every CLOCK_RESOLUTION seconds"""
+        global _tickers
+        with _tickers_lock:
+            CoarseClock.tick()  # Don't serve a stale value before the first tick
+            _tickers += 1
+    
+    @staticmethod
+    def remove_ticker():
+        """Unregister a thread added with add_ticker"""
+        global _tickers
+        with _tickers_lock:
+            _tickers -= 1
+    
+    @staticmethod
+    def from_wall(timestamp: float) -> float:
+        """Convert a wall-clock timestamp to coarse monotonic time"""
+        return CoarseClock.now() - (time.time() - timestamp)
 
 class Participant:
     """Represents a participant in the distributed system"""
+    __slots__ = ('id', 'type', 'address', 'hostname', 'join_time', 'last_seen',
+                 'is_active', 'metadata', 'timeout', '_id_lower', '_host_lower')
+    
     def __init__(self, participant_id: str, participant_type: str, address: Tuple[str, int], 
-                 hostname: str = None, join_time: float = None):
+                 hostname: str = None, join_time: float = None, timeout: float = None):
         self.id = participant_id
         self.type = participant_type  # 'server' or 'client'
         self.address = address
         self.hostname = hostname
-        self.join_time = join_time or time.time()
-        self.last_seen = time.time()
+        # Lowercased once here so searches don't re-lowercase on every call
+        self._id_lower = participant_id.lower()
+        self._host_lower = (hostname or "").lower()
+        # join_time is given as wall-clock time, like to_dict reports it
+        self.join_time = CoarseClock.from_wall(join_time) if join_time else CoarseClock.now()
+        self.last_seen = CoarseClock.now()
         self.is_active = True
         self.metadata = {}
+        self.timeout = timeout  # Overrides the view's per-type timeout when set
     
-    def update_activity(self):
-        """Update last seen timestamp"""
-        self.last_seen = time.time()
+    def update_activity(self) -> bool:
+        """Update last seen timestamp, returning True if the participant was inactive"""
+        was_inactive = not self.is_active
+        self.last_seen = CoarseClock.now()
         self.is_active = True
+        return was_inactive
     
-    def mark_inactive(self):
-        """Mark participant as inactive"""
+    def mark_inactive(self) -> bool:
+        """Mark participant as inactive, returning True if it was active"""
+        was_active = self.is_active
         self.is_active = False
+        return was_active
+    
+    def search_keys(self) -> Set[str]:
+        """Get the trigrams of the lowercased ID and hostname"""
+        keys = set()
+        for text in (self._id_lower, self._host_lower):
+            keys.update(text[i:i + 3] for i in range(len(text) - 2))
+        return keys
     
-    def to_dict(self):
-        """Convert participant to dictionary representation"""
+    def to_dict(self, now: float = None, wall_now: float = None):
+        """
+        Convert participant to dictionary representation (timestamps as wall-clock time).
+        
+        Callers converting many participants can pass the coarse and wall-clock
+        times once instead of reading both clocks per participant.
+        """
+        if now is None:
+            now = CoarseClock.now()
+        if wall_now is None:
+            wall_now = time.time()
         return {
             'id': self.id,
             'type': self.type,
             'address': self.address,
             'hostname': self.hostname,
-            'join_time': self.join_time,
-            'last_seen': self.last_seen,
+            'join_time': wall_now - (now - self.join_time),
+            'last_seen': wall_now - (now - self.last_seen),
             'is_active': self.is_active,
-            'uptime': time.time() - self.join_time,
+            'uptime': now - self.join_time,
             'metadata': self.metadata
         }
 
@@ -48,100 +133,200 @@ class GroupView:
         self.client_timeout = client_timeout
         self.event_callbacks = []
         self.cleanup_thread = None
+        self._dispatch_thread = None
+        self._event_q = queue.SimpleQueue()
+        self._stop_event = threading.Event()
         self.running = False
         self.lock = threading.Lock()
+        
+        # Striped locks serialize state transitions of a single participant so
+        # refreshing existing participants doesn't contend on self.lock.
+        # Lock order: shard lock before self.lock
+        self._shard_locks = [threading.Lock() for _ in range(NUM_SHARDS)]
+        
+        # Per-thread bulk_update state: while active the thread already holds
+        # self.lock, and snapshot publishing and events are deferred to the end
+        self._bulk = threading.local()
+        
+        # Read-only snapshot published on every membership change; readers
+        # dereference it without taking the lock
+        self._snapshot: Tuple[Participant, ...] = ()
+        self._snapshot_by_id: Mapping[str, Participant] = MappingProxyType({})
+        
+        # Type/activity indices maintained incrementally under self.lock
+        self._servers: Set[str] = set()
+        self._clients: Set[str] = set()
+        self._active_servers: Set[str] = set()
+        self._active_clients: Set[str] = set()
+        self._counts = {'servers': 0, 'clients': 0, 'active_servers': 0, 'active_clients': 0}
+        self._index_views: Dict[str, Tuple[Participant, ...]] = {
+            'servers': (), 'clients': (), 'active_servers': (), 'active_clients': ()
+        }
+        # Published copy of _counts; replaced on publish, never mutated
+        self._counts_view: Dict[str, int] = self._counts.copy()
+        
+        # Expiry timeline: (expiry, participant_id, generation). A generation is
+        # assigned per join so entries left behind by a removed participant are skipped
+        self._expiry_heap: List[Tuple[float, str, int]] = []
+        self._gen: Dict[str, int] = {}
+        self._next_gen = 0
+        
+        # Trigram -> IDs of participants whose ID or hostname contains it. Values
+        # are replaced (never mutated) so searches can read without the lock
+        self._trigram_index: Dict[str, frozenset] = {}
+        
+        # (computed_at, status) for get_system_status; cleared on every publish
+        self._status_cache: Optional[Tuple[float, Dict]] = None
     
     def start(self):
         """Start the group view manager"""
+        if self.running:
+            return
         self.running = True
+        self._stop_event.clear()
+        CoarseClock.add_ticker()
         self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
         self.cleanup_thread.start()
+        self._dispatch_thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatch_thread.start()
     
     def stop(self):
         """Stop the group view manager"""
+        if not self.running:
+            return
         self.running = False
+        self._stop_event.set()
+        self._event_q.put_nowait(None)  # Wake the dispatcher so it can exit
         if self.cleanup_thread:
-            self.cleanup_thread.join()
+            self.cleanup_thread.join(timeout=1.0)
+        if self._dispatch_thread:
+            self._dispatch_thread.join(timeout=1.0)
+        CoarseClock.remove_ticker()
     
     def add_participant(self, participant_id: str, participant_type: str, 
-                       address: Tuple[str, int], hostname: str = None) -> bool:
+                       address: Tuple[str, int], hostname: str = None,
+                       timeout: float = None) -> bool:
         """Add a new participant to the group view"""
-        with self.lock:
-            if participant_id in self.participants:
-                # Update existing participant
-                self.participants[participant_id].update_activity()
-                return False
-            else:
-                # Add new participant
-                participant = Participant(participant_id, participant_type, address, hostname)
-                self.participants[participant_id] = participant
-                self._notify_event('join', participant)
-                return True
+        participant = self._lookup(participant_id)
+        if participant is None:
+            with self._locked():
+                participant = self.participants.get(participant_id)
+                if participant is None:
+                    # Add new participant
+                    participant = Participant(participant_id, participant_type, address, hostname,
+                                              timeout=timeout)
+                    self.participants[participant_id] = participant
+                    self._index_add(participant)
+                    self._schedule_expiry(participant)
+                    self._publish_snapshot()
+                    self._notify_event('join', participant)
+                    return True
+        
+        # Update existing participant
+        self._refresh_participant(participant)
+        return False
     
     def remove_participant(self, participant_id: str) -> bool:
         """Remove a participant from the group view"""
-        with self.lock:
+        with self._locked():
             if participant_id in self.participants:
                 participant = self.participants.pop(participant_id)
+                self._index_remove(participant)
+                self._gen.pop(participant_id, None)
+                self._publish_snapshot()
                 self._notify_event('leave', participant)
                 return True
             return False
     
     def update_participant_activity(self, participant_id: str):
         """Update participant's last seen timestamp"""
+        participant = self._lookup(participant_id)
+        if participant is not None:
+            self._refresh_participant(participant)
+    
+    def mark_participant_inactive(self, participant_id: str):
+        """Mark a participant inactive without removing it from the view"""
+        participant = self._lookup(participant_id)
+        if participant is None:
+            return
+        with self._shard_guard(participant_id):
+            if participant.mark_inactive():
+                with self._locked():
+                    self._sync_active(participant)
+                    self._publish_snapshot()
+    
+    def next_expiry(self) -> Optional[float]:
+        """Get the earliest queued expiry time (coarse monotonic), if any"""
+        heap = self._expiry_heap
+        return heap[0][0] if heap else None
+    
+    @contextmanager
+    def bulk_update(self):
+        """
+        Apply a burst of mutations under a single lock acquisition.
+        
+        The lock is held for the whole block; the snapshot is published once
+        and queued events are released when the block exits.
+        """
+        if self._in_bulk():
+            yield self  # Nested bulk_update joins the outer one
+            return
+        
         with self.lock:
-            if participant_id in self.participants:
-                self.participants[participant_id].update_activity()
+            self._bulk.active = True
+            self._bulk.dirty = False
+            self._bulk.events = []
+            try:
+                yield self
+            finally:
+                self._bulk.active = False
+                if self._bulk.dirty:
+                    self._publish_snapshot()
+                events, self._bulk.events = self._bulk.events, []
+        
+        for event in events:
+            self._event_q.put_nowait(event)
     
     def get_participant(self, participant_id: str) -> Optional[Participant]:
         """Get a specific participant by ID"""
-        with self.lock:
-            return self.participants.get(participant_id)
+        return self._snapshot_by_id.get(participant_id)
+    
+    def iter_participants(self) -> Iterable[Participant]:
+        """Get all participants without copying (an immutable snapshot)"""
+        return self._snapshot
+    
+    def get_participants_view(self) -> Mapping[str, Participant]:
+        """Get a read-only ID -> participant mapping without copying"""
+        return self._snapshot_by_id
     
     def get_all_participants(self) -> List[Participant]:
         """Get all participants"""
-        with self.lock:
-            return list(self.participants.values())
+        return list(self._snapshot)
     
     def get_active_participants(self) -> List[Participant]:
         """Get only active participants"""
-        with self.lock:
-            return [p for p in self.participants.values() if p.is_active]
+        views = self._index_views
+        return list(views['active_servers'] + views['active_clients'])
     
     def get_servers(self) -> List[Participant]:
         """Get all server participants"""
-        with self.lock:
-            return [p for p in self.participants.values() if p.type == 'server']
+        return list(self._index_views['servers'])
     
     def get_clients(self) -> List[Participant]:
         """Get all client participants"""
-        with self.lock:
-            return [p for p in self.participants.values() if p.type == 'client']
+        return list(self._index_views['clients'])
     
     def get_active_servers(self) -> List[Participant]:
         """Get active server participants"""
-        with self.lock:
-            return [p for p in self.participants.values() if p.type == 'server' and p.is_active]
+        return list(self._index_views['active_servers'])
     
     def get_active_clients(self) -> List[Participant]:
         """Get active client participants"""
-        with self.lock:
-            return [p for p in self.participants.values() if p.type == 'client' and p.is_active]
+        return list(self._index_views['active_clients'])
     
     def get_participant_count(self) -> Dict[str, int]:
         """Get count of participants by type"""
-        with self.lock:
-            counts = {'servers': 0, 'clients': 0, 'active_servers': 0, 'active_clients': 0}
-            for participant in self.participants.values():
-                if participant.type == 'server':
-                    counts['servers'] += 1
-                    if participant.is_active:
-                        counts['active_servers'] += 1
-                elif participant.type == 'client':
-                    counts['clients'] += 1
-                    if participant.is_active:
-                        counts['active_clients'] += 1
-            return counts
+        return self._counts_view.copy()
     
     def get_leader_info(self) -> Optional[Dict]:
         """Get current leader information"""
@@ -153,82 +338,288 @@ class GroupView:
     
     def search_participants(self, query: str) -> List[Participant]:
         """Search participants by hostname or ID"""
-        with self.lock:
-            results = []
-            query_lower = query.lower()
-            for participant in self.participants.values():
-                if (query_lower in participant.id.lower() or 
-                    (participant.hostname and query_lower in participant.hostname.lower())):
-                    results.append(participant)
-            return results
+        query_lower = query.lower()
+        if len(query_lower) < 3:
+            candidates = self.iter_participants()
+        else:
+            # Every substring match contains all of the query's trigrams
+            index = self._trigram_index
+            by_id = self._snapshot_by_id
+            ids = None
+            for i in range(len(query_lower) - 2):
+                matches = index.get(query_lower[i:i + 3])
+                if not matches:
+                    return []
+                ids = matches if ids is None else ids & matches
+            candidates = [by_id[pid] for pid in ids if pid in by_id]
+        
+        return [p for p in candidates
+                if query_lower in p._id_lower or query_lower in p._host_lower]
     
     def get_system_status(self) -> Dict:
-        """Get comprehensive system status"""
-        with self.lock:
-            counts = self.get_participant_count()
-            leader_info = self.get_leader_info()
-            
-            return {
-                'timestamp': time.time(),
-                'participant_counts': counts,
-                'total_participants': len(self.participants),
-                'active_participants': len(self.get_active_participants()),
-                'current_leader': leader_info,
-                'participants': [p.to_dict() for p in self.participants.values()]
-            }
+        """Get comprehensive system status (cached for STATUS_CACHE_TTL seconds)"""
+        cached = self._status_cache
+        if cached and CoarseClock.now() - cached[0] < STATUS_CACHE_TTL:
+            return cached[1]
+        
+        leader_id = str(current_leader) if current_leader else None
+        now = CoarseClock.now()
+        wall_now = time.time()
+        
+        # Single pass over one snapshot: counts, leader and participant dicts all
+        # describe exactly the same set of participants
+        counts = {'servers': 0, 'clients': 0, 'active_servers': 0, 'active_clients': 0}
+        participant_dicts = []
+        leader_info = None
+        for participant in self.iter_participants():
+            info = participant.to_dict(now, wall_now)
+            participant_dicts.append(info)
+            if participant.type == 'server' or participant.type == 'client':
+                key = participant.type + 's'
+                counts[key] += 1
+                if participant.is_active:
+                    counts['active_' + key] += 1
+            if participant.id == leader_id:
+                leader_info = info
+        
+        status = {
+            'timestamp': wall_now,
+            'participant_counts': counts,
+            'total_participants': len(participant_dicts),
+            'active_participants': counts['active_servers'] + counts['active_clients'],
+            'current_leader': leader_info,
+            'participants': participant_dicts
+        }
+        self._status_cache = (now, status)
+        return status
     
     def add_event_callback(self, callback):
         """Add event callback for join/leave notifications"""
         self.event_callbacks.append(callback)
     
+    def _index_sets(self, participant: Participant) -> Tuple[Optional[Set[str]], Optional[Set[str]], str]:
+        """Return the (all, active) index sets and count key for a participant's type"""
+        if participant.type == 'server':
+            return self._servers, self._active_servers, 'servers'
+        if participant.type == 'client':
+            return self._clients, self._active_clients, 'clients'
+        return None, None, ''
+    
+    def _index_add(self, participant: Participant):
+        """Add a participant to the type/activity indices (caller must hold self.lock)"""
+        index = self._trigram_index
+        for key in participant.search_keys():
+            index[key] = index.get(key, frozenset()) | {participant.id}
+        
+        members, active, key = self._index_sets(participant)
+        if members is None:
+            return
+        members.add(participant.id)
+        self._counts[key] += 1
+        if participant.is_active:
+            active.add(participant.id)
+            self._counts['active_' + key] += 1
+    
+    def _index_remove(self, participant: Participant):
+        """Remove a participant from the type/activity indices (caller must hold self.lock)"""
+        index = self._trigram_index
+        for key in participant.search_keys():
+            remaining = index.get(key, frozenset()) - {participant.id}
+            if remaining:
+                index[key] = remaining
+            else:
+                index.pop(key, None)
+        
+        members, active, key = self._index_sets(participant)
+        if members is None or participant.id not in members:
+            return
+        members.discard(participant.id)
+        self._counts[key] -= 1
+        if participant.id in active:
+            active.discard(participant.id)
+            self._counts['active_' + key] -= 1
+    
+    def _sync_active(self, participant: Participant):
+        """Match the active index to the participant's is_active flag (caller must hold self.lock)"""
+        members, active, key = self._index_sets(participant)
+        # Skip stale objects for participants that were removed (or removed and rejoined)
+        if members is None or self.participants.get(participant.id) is not participant:
+            return
+        is_active = participant.is_active
+        if is_active and participant.id not in active:
+            active.add(participant.id)
+            self._counts['active_' + key] += 1
+        elif not is_active and participant.id in active:
+            active.discard(participant.id)
+            self._counts['active_' + key] -= 1
+    
+    def _in_bulk(self) -> bool:
+        """Check whether the calling thread is inside bulk_update"""
+        return getattr(self._bulk, 'active', False)
+    
+    def _locked(self):
+        """Acquire self.lock unless the calling thread already holds it via bulk_update"""
+        return nullcontext() if self._in_bulk() else self.lock
+    
+    def _lookup(self, participant_id: str) -> Optional[Participant]:
+        """Find a participant, seeing unpublished changes made inside bulk_update"""
+        if self._in_bulk():
+            return self.participants.get(participant_id)
+        return self._snapshot_by_id.get(participant_id)
+    
+    def _shard_lock(self, participant_id: str) -> threading.Lock:
+        """Get the lock stripe for a participant ID"""
+        return self._shard_locks[hash(participant_id) & (NUM_SHARDS - 1)]
+    
+    def _shard_guard(self, participant_id: str):
+        """
+        Acquire a participant's shard lock unless inside bulk_update.
+        
+        Taking a shard lock while holding self.lock would invert the lock
+        order; _sync_active reads is_active under self.lock, so the index
+        still ends up matching the participant's final state.
+        """
+        return nullcontext() if self._in_bulk() else self._shard_lock(participant_id)
+    
+    def _refresh_participant(self, participant: Participant):
+        """Record activity for an existing participant"""
+        if participant.is_active:
+            # Steady state: a single attribute store is atomic, no lock needed
+            participant.last_seen = CoarseClock.now()
+            return
+        
+        with self._shard_guard(participant.id):
+            if participant.update_activity():
+                # Inactive -> active is the only transition that touches shared indices
+                with self._locked():
+                    self._sync_active(participant)
+                    self._publish_snapshot()
+    
+    def _timeout_for(self, participant: Participant) -> float:
+        """Get the inactivity timeout that applies to a participant"""
+        if participant.timeout is not None:
+            return participant.timeout
+        return self.server_timeout if participant.type == 'server' else self.client_timeout
+    
+    def _schedule_expiry(self, participant: Participant):
+        """Queue a participant on the expiry timeline under a new generation (caller must hold self.lock)"""
+        self._next_gen += 1
+        self._gen[participant.id] = self._next_gen
+        expiry = participant.last_seen + self._timeout_for(participant)
+        heapq.heappush(self._expiry_heap, (expiry, participant.id, self._next_gen))
+    
+    def _publish_snapshot(self):
+        """Rebuild and publish the read-only snapshot (caller must hold self.lock)"""
+        if self._in_bulk():
+            self._bulk.dirty = True
+            return
+        
+        snapshot_by_id = dict(self.participants)
+        self._index_views = {
+            'servers': tuple(snapshot_by_id[pid] for pid in self._servers),
+            'clients': tuple(snapshot_by_id[pid] for pid in self._clients),
+            'active_servers': tuple(snapshot_by_id[pid] for pid in self._active_servers),
+            'active_clients': tuple(snapshot_by_id[pid] for pid in self._active_clients),
+        }
+        self._counts_view = self._counts.copy()
+        self._status_cache = None
+        # Single attribute stores are atomic, so readers always see a consistent pair
+        self._snapshot_by_id = MappingProxyType(snapshot_by_id)
+        self._snapshot = tuple(snapshot_by_id.values())
+    
     def _notify_event(self, event_type: str, participant: Participant):
-        """Notify all event callbacks"""
-        for callback in self.event_callbacks:
-            try:
-                callback(event_type, participant)
-            except Exception as e:
-                print(f"Error in event callback: {e}")
+        """Queue an event for the dispatcher thread; never blocks the caller"""
+        if self._in_bulk():
+            self._bulk.events.append((event_type, participant))
+        else:
+            self._event_q.put_nowait((event_type, participant))
+    
+    def _dispatch_loop(self):
+        """Deliver queued events to callbacks outside of any group view lock"""
+        while True:
+            event = self._event_q.get()
+            if event is None:
+                break
+            event_type, participant = event
+            for callback in self.event_callbacks:
+                try:
+                    callback(event_type, participant)
+                except Exception as e:
+                    safe_print(f"Error in event callback: {e}")
     
     def _cleanup_loop(self):
         """Background cleanup loop for inactive participants"""
-        while self.running:
-            time.sleep(15)  # Check every 15 seconds
-            self._cleanup_inactive_participants()
+        while not self._stop_event.wait(CLOCK_RESOLUTION):
+            now = CoarseClock.tick()
+            # Peeking at the earliest expiry is O(1); only pop when something is due
+            expiry = self.next_expiry()
+            if expiry is not None and expiry <= now:
+                self._cleanup_inactive_participants()
     
     def _cleanup_inactive_participants(self):
         """Remove participants that haven't been seen recently"""
-        current_time = time.time()
-        inactive_participants = []
+        current_time = CoarseClock.now()
+        removed = []
         
         with self.lock:
-            for participant in self.participants.values():
-                timeout = self.server_timeout if participant.type == 'server' else self.client_timeout
-                if current_time - participant.last_seen > timeout:
-                    inactive_participants.append(participant.id)
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= current_time:
+                expiry, participant_id, gen = heapq.heappop(heap)
+                if self._gen.get(participant_id) != gen:
+                    continue  # Participant left or rejoined since this entry was pushed
+                
+                participant = self.participants[participant_id]
+                # Activity updates don't touch the heap, so re-check the real deadline
+                actual_expiry = participant.last_seen + self._timeout_for(participant)
+                if actual_expiry > current_time:
+                    heapq.heappush(heap, (actual_expiry, participant_id, gen))
+                    continue
+                
+                del self.participants[participant_id]
+                del self._gen[participant_id]
+                self._index_remove(participant)
+                removed.append(participant)
+                self._notify_event('timeout', participant)
             
-            for participant_id in inactive_participants:
-                if participant_id in self.participants:
-                    participant = self.participants.pop(participant_id)
-                    print(f"Removed inactive {participant.type}: {participant.id}")
-                    self._notify_event('timeout', participant)
+            if removed:
+                self._publish_snapshot()
+        
+        # Reported once the lock is released
+        for participant in removed:
+            safe_print(f"Removed inactive {participant.type}: {participant.id}")
     
     def sync_with_legacy_views(self):
         """Synchronize with existing group_view_servers and group_view_clients"""
-        # Sync servers
-        for server_id in group_view_servers.copy():
-            if str(server_id) not in self.participants:
-                self.add_participant(str(server_id), 'server', ('unknown', 0))
+        # Copy the legacy structures first; other threads keep mutating them
+        legacy_servers = [(str(server_id), 'server', ('unknown', 0)) for server_id in group_view_servers.snapshot()]
+        legacy_clients = [(f"{addr[0]}:{addr[1]}", 'client', addr) for addr in group_view_clients.copy()]
+        legacy_last_seen = list(server_last_seen.items())
         
-        # Sync clients
-        for client_addr in group_view_clients.copy():
-            client_id = f"{client_addr[0]}:{client_addr[1]}"
-            if client_id not in self.participants:
-                self.add_participant(client_id, 'client', client_addr)
+        joined = []
+        with self._locked():
+            # Add missing servers and clients
+            for participant_id, participant_type, address in legacy_servers + legacy_clients:
+                if participant_id not in self.participants:
+                    participant = Participant(participant_id, participant_type, address)
+                    self.participants[participant_id] = participant
+                    self._index_add(participant)
+                    joined.append(participant)
+            
+            # Update server timestamps from server_last_seen
+            for server_id, last_seen in legacy_last_seen:
+                participant = self.participants.get(str(server_id))
+                if participant:
+                    participant.last_seen = CoarseClock.from_wall(last_seen)
+            
+            # Schedule expiry after last_seen is final so the heap entries are accurate
+            for participant in joined:
+                self._schedule_expiry(participant)
+            
+            if joined:
+                self._publish_snapshot()
         
-        # Update server timestamps from server_last_seen
-        for server_id, last_seen in server_last_seen.items():
-            if str(server_id) in self.participants:
-                self.participants[str(server_id)].last_seen = last_seen
+        for participant in joined:
+            self._notify_event('join', participant)
 
 # Global group view instance
 group_view = GroupView()
@@ -248,26 +639,31 @@ def stop_group_view():
 def print_system_status():
     """Print comprehensive system status"""
     status = group_view.get_system_status()
-    print("\n" + "="*50)
-    print("DISTRIBUTED SYSTEM STATUS")
-    print("="*50)
-    print(f"Total Participants: {status['total_participants']}")
-    print(f"Active Participants: {status['active_participants']}")
-    print(f"Servers: {status['participant_counts']['active_servers']}/{status['participant_counts']['servers']}")
-    print(f"Clients: {status['participant_counts']['active_clients']}/{status['participant_counts']['clients']}")
+    counts = status['participant_counts']
+    lines = [
+        "\n" + "="*50,
+        "DISTRIBUTED SYSTEM STATUS",
+        "="*50,
+        f"Total Participants: {status['total_participants']}",
+        f"Active Participants: {status['active_participants']}",
+        f"Servers: {counts['active_servers']}/{counts['servers']}",
+        f"Clients: {counts['active_clients']}/{counts['clients']}",
+    ]
     
     leader_info = status['current_leader']
     if leader_info:
-        print(f"Current Leader: {leader_info['hostname']} (ID: {leader_info['id']})")
+        lines.append(f"Current Leader: {leader_info['hostname']} (ID: {leader_info['id']})")
     else:
-        print("Current Leader: None")
+        lines.append("Current Leader: None")
     
-    print("\nACTIVE PARTICIPANTS:")
-    print("-" * 50)
+    lines.append("\nACTIVE PARTICIPANTS:")
+    lines.append("-" * 50)
     for participant in status['participants']:
         if participant['is_active']:
             uptime = int(participant['uptime'])
-            print(f"{participant['type'].upper()}: {participant['id']} "
-                  f"({participant['hostname']}) - Uptime: {uptime}s")
+            lines.append(f"{participant['type'].upper()}: {participant['id']} "
+                         f"({participant['hostname']}) - Uptime: {uptime}s")
     
-    print("="*50)
\ No newline at end of file
+    lines.append("="*50)
+    # One queued write instead of a print() per line
+    safe_print("\n".join(lines))
@@ -1,13 +1,21 @@
+import os
+import bisect
 import socket
 import threading
-import time
 import json
+from concurrent.futures import ThreadPoolExecutor
+from resources.net_batch import sendmmsg
 from resources.utils import group_view_servers, current_leader, leader_election_in_progress, my_server_id, MULTICAST_GROUP_ADDRESS
 
 class BullyLeaderElection:
     def __init__(self, server_id, server_ip):
         self.server_id = server_id
         self.server_ip = server_ip
+        # Bounded worker pool for this instance's election rounds; election storms
+        # queue here instead of spawning a new thread per ELECTION message or trigger
+        self._peer_pool = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4),
+                                             thread_name_prefix="bully")
+        self._stopped = threading.Event()  # Set by stop(); queued rounds then return at once
         self.election_timeout = 5  # seconds
         self.coordinator_timeout = 10  # seconds
         self.ok_received = False
@@ -15,11 +23,13 @@ class BullyLeaderElection:
         
     def get_higher_priority_servers(self):
         """Get servers with higher priority (higher IDs)"""
-        return [server for server in group_view_servers if server > self.server_id]
+        ids = group_view_servers.sorted_tuple()
+        return list(ids[bisect.bisect_right(ids, self.server_id):])
     
     def get_lower_priority_servers(self):
         """Get servers with lower priority (lower IDs)"""
-        return [server for server in group_view_servers if server < self.server_id]
+        ids = group_view_servers.sorted_tuple()
+        return list(ids[:bisect.bisect_left(ids, self.server_id)])
     
     def send_election_message(self, target_servers):
         """Send ELECTION message to higher priority servers"""
@@ -32,8 +42,7 @@ class BullyLeaderElection:
             "sender_ip": self.server_ip
         }
         
-        for server in target_servers:
-            self.send_message(server, election_msg)
+        self.send_messages(target_servers, election_msg)
     
     def send_ok_message(self, target_server):
         """Send OK message to the requesting server"""
@@ -52,9 +61,8 @@ class BullyLeaderElection:
             "sender_ip": self.server_ip
         }
         
-        for server in group_view_servers:
-            if server != self.server_id:
-                self.send_message(server, coordinator_msg)
+        self.send_messages([server for server in group_view_servers.snapshot() if server != self.server_id],
+                           coordinator_msg)
     
     def send_message(self, target_server, message):
         """Send message to target server via multicast"""
@@ -70,10 +78,29 @@ class BullyLeaderElection:
         except Exception as e:
             print(f"Error sending message to {target_server}: {e}")
     
+    def send_messages(self, target_servers, message):
+        """Send one copy of message per target server in a single batched send"""
+        if not target_servers:
+            return
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+            
+            batch = []
+            for target_server in target_servers:
+                message["target_server"] = target_server
+                batch.append((json.dumps(message).encode(), MULTICAST_GROUP_ADDRESS))
+            sendmmsg(sock, batch)
+            sock.close()
+        except Exception as e:
+            print(f"Error sending messages to {target_servers}: {e}")
+    
     def start_election(self):
         """Start the bully election process"""
         global leader_election_in_progress, current_leader
         
+        if self._stopped.is_set():
+            return  # Queued before stop()
         if leader_election_in_progress:
             return  # Election already in progress
             
@@ -91,15 +118,19 @@ class BullyLeaderElection:
         self.ok_received = False
         self.send_election_message(higher_priority_servers)
         
-        # Wait for OK responses
-        time.sleep(self.election_timeout)
+        # Wait for OK responses; stop() ends the wait
+        if self._stopped.wait(self.election_timeout):
+            leader_election_in_progress = False
+            return
         
         if not self.ok_received:
             # No OK received, become leader
             self.become_leader()
         else:
             # OK received, wait for coordinator message
-            time.sleep(self.coordinator_timeout)
+            if self._stopped.wait(self.coordinator_timeout):
+                leader_election_in_progress = False
+                return
             if current_leader is None:
                 # No coordinator message received, restart election
                 leader_election_in_progress = False
@@ -123,7 +154,19 @@ class BullyLeaderElection:
             
             # Start own election if not already in progress
             if not leader_election_in_progress:
-                threading.Thread(target=self.start_election, daemon=True).start()
+                self.run_async(self.start_election)
+    
+    def run_async(self, func, *args):
+        """Run election work on this instance's worker pool"""
+        try:
+            return self._peer_pool.submit(func, *args)
+        except RuntimeError:
+            return None  # Pool already shut down
+    
+    def stop(self):
+        """Shut down this instance's election worker pool"""
+        self._stopped.set()
+        self._peer_pool.shutdown(wait=False)
     
     def handle_ok_message(self, sender_id):
         """Handle incoming OK message"""
@@ -163,12 +206,19 @@ def initialize_election(server_id, server_ip):
     """Initialize the election system"""
     global election_instance, my_server_id
     my_server_id = server_id
+    if election_instance:
+        election_instance.stop()  # Its rounds would race the new instance's
     election_instance = BullyLeaderElection(server_id, server_ip)
 
+def stop_election():
+    """Stop running elections on shutdown"""
+    if election_instance:
+        election_instance.stop()
+
 def trigger_election():
     """Trigger a new election"""
     if election_instance:
-        threading.Thread(target=election_instance.start_election, daemon=True).start()
+        election_instance.run_async(election_instance.start_election)
 
 def handle_election_message(message):
     """Handle incoming election message"""
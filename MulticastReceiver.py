@@ -1,44 +1,108 @@
 import socket
-import struct
 import time
 import json
 
 from resources.utils import MULTICAST_GROUP_ADDRESS
-from resources.utils import MULTICAST_IP
-from resources.utils import MULTICAST_PORT
+from resources.utils import create_multicast_receiver
 from resources.utils import BUFFER_SIZE
 from resources.utils import group_view_servers
 from resources.utils import group_view_clients
 from resources.utils import server_last_seen
 from resources.utils import client_last_seen
+from resources.utils import safe_print
+from resources.utils import is_chat_frame, pack_chat_frame, unpack_chat_frame, user_id_for, FRAME_FLAG_ALIVE, FRAME_ACK
+from resources.utils import (DISCOVERY_ALIVE, DISCOVERY_PROBE, DISCOVERY_RESPONSE, DISCOVERY_PROBE_CAPABLE,
+                             pack_discovery_frame, is_discovery_frame, unpack_discovery_frame,
+                             generate_server_id, get_local_ip)
 from LeaderElection import handle_election_message, get_current_leader, trigger_election
 from GroupView import get_group_view, start_group_view, print_system_status
 from FaultTolerance import get_fault_tolerance_manager
 
-# Creating a UDP socket instance 
-UDP_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+# Creating the UDP socket: bound to the Multicast port (shareable via
+# SO_REUSEPORT) and joined to the Multicast Group
+UDP_socket = create_multicast_receiver()
 
-# Allowing the reuse 
-UDP_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+safe_print(f"\nListening for messages on: {MULTICAST_GROUP_ADDRESS}")
 
-# Binding the socket to the Multicast port
-UDP_socket.bind(('', MULTICAST_PORT)) 
+# Resolve this host's identity once instead of on every probe
+local_hostname = socket.gethostname()
+local_host_ip = socket.gethostbyname(local_hostname)
+my_server_id = generate_server_id(get_local_ip(), local_hostname)  # Same ID Server.py announces
+server_response = f"SERVER_RESPONSE:{local_hostname}:{local_host_ip}"
+discovery_response = pack_discovery_frame(DISCOVERY_RESPONSE, local_host_ip, local_hostname, my_server_id)
+chat_ack_text = f"\nYour message was received by {local_hostname}!".encode()
 
-# Joining the Multicast Group
-mreq = struct.pack("4sl", socket.inet_aton(MULTICAST_IP), socket.INADDR_ANY)
-UDP_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+# Announcements from a server seen within this many seconds skip all view updates
+ANNOUNCE_DEDUP_WINDOW = 5
 
-print(f"\nListening for messages on: {MULTICAST_GROUP_ADDRESS}")
+# One receive buffer for the life of the socket; each datagram is read into it
+# and viewed without copying
+rx_buffer = bytearray(BUFFER_SIZE)
+rx_view = memoryview(rx_buffer)
+
+# Chat frames carry a numeric user ID; map it back to the client ID seen at join
+client_names = {}
 
 # Start the unified group view
 start_group_view()
 group_view = get_group_view()
 
+def reply_to_probe(msg_type, server_ip, server_name, server_id, client_addr):
+    """Answer another server's discovery probe"""
+    # Don't respond to our own probes
+    if server_id != my_server_id:
+        UDP_socket.sendto(discovery_response, client_addr)
+
+def note_server_announcement(msg_type, server_ip, server_name, server_id, client_addr):
+    """Record a server from its ALIVE or PROBE_CAPABLE announcement"""
+    # Each announcement batch carries both frames; if this server was
+    # refreshed moments ago there is nothing to update
+    if time.time() - server_last_seen.get(server_id, 0) < ANNOUNCE_DEDUP_WINDOW:
+        return
+    is_new = server_id not in group_view_servers
+    group_view_servers.add(server_id)
+    server_last_seen[server_id] = time.time()
+    group_view.add_participant(str(server_id), 'server', (server_ip, 0), server_name)
+    
+    # Trigger election when new server joins
+    if is_new and msg_type == DISCOVERY_ALIVE and len(group_view_servers) > 1:
+        safe_print(f"Discovered server: {server_name} at {server_ip} (ID: {server_id})")
+        trigger_election()
+
+discovery_handlers = {
+    DISCOVERY_PROBE: reply_to_probe,
+    DISCOVERY_ALIVE: note_server_announcement,
+    DISCOVERY_PROBE_CAPABLE: note_server_announcement,
+}
+
 while True:
     try:   
-        data, client_addr = UDP_socket.recvfrom(BUFFER_SIZE)
-        msg = data.decode()
-        print(f"Received message from {client_addr}: {msg}")
+        nbytes, client_addr = UDP_socket.recvfrom_into(rx_buffer, BUFFER_SIZE)
+        data = rx_view[:nbytes]  # Only valid until the next receive
+        
+        if is_chat_frame(data):
+            # Binary chat frame: route on the fixed header, decode only the text
+            frame_type, group_id, user_id, request_id, payload = unpack_chat_frame(data)
+            client_id = client_names.get(user_id)
+            if client_id and frame_type & FRAME_FLAG_ALIVE:
+                # Chat traffic stands in for the client's heartbeat
+                client_last_seen[client_addr] = time.time()
+                group_view.update_participant_activity(client_id)
+            sender = client_id or f"user {user_id}"
+            safe_print(f"Received message from {sender} at {client_addr}: {str(payload, 'utf-8', 'replace')}")
+            UDP_socket.sendto(pack_chat_frame(FRAME_ACK, group_id, user_id, chat_ack_text, request_id), client_addr)
+            continue
+        
+        if is_discovery_frame(data):
+            # Binary discovery frame from a DiscoveryManager: the type byte picks the handler
+            msg_type, server_ip, server_name, server_id = unpack_discovery_frame(data)
+            handler = discovery_handlers.get(msg_type)
+            if handler:
+                handler(msg_type, server_ip, server_name, server_id, client_addr)
+            continue  # Discovery frames never get the generic text reply
+        
+        msg = str(data, 'utf-8')
+        safe_print(f"Received message from {client_addr}: {msg}")
         
         # Handle message with fault tolerance if available
         ft_manager = get_fault_tolerance_manager()
@@ -48,7 +112,7 @@ while True:
                 if processed_msg.get('type') == 'reliable_message':
                     # Handle reliable message
                     reliable_msg = processed_msg['message']
-                    print(f"Processing reliable message: {reliable_msg.msg_type} from {reliable_msg.sender_id}")
+                    safe_print(f"Processing reliable message: {reliable_msg.msg_type} from {reliable_msg.sender_id}")
                     # Continue with normal processing
                 elif processed_msg.get('type') == 'heartbeat_ack':
                     # Send heartbeat acknowledgment
@@ -64,7 +128,9 @@ while True:
             else:
                 client_id = f"{client_addr[0]}:{client_addr[1]}"
                 
-            print(f"\nClient {client_id} at {client_addr} wants to join.")
+            safe_print(f"\nClient {client_id} at {client_addr} wants to join.")
+            
+            client_names[user_id_for(client_id)] = client_id
             
             # Add client to legacy view for backward compatibility
             group_view_clients.add(client_addr)
@@ -74,7 +140,7 @@ while True:
             group_view.add_participant(client_id, 'client', client_addr)
             
             leader_id = get_current_leader()
-            leader_name = socket.gethostname() if leader_id else "No leader elected"
+            leader_name = local_hostname if leader_id else "No leader elected"
             response = f"\nWelcome {client_id}! Current Leader: {leader_name} (ID: {leader_id})"
         elif msg.startswith("SERVER_ALIVE:"):
             # Handle server announcements
@@ -82,7 +148,7 @@ while True:
             if len(parts) >= 3:
                 server_ip = parts[1]
                 server_name = parts[2]
-                server_id = hash(server_ip + server_name) % 10000  # Generate same ID as server
+                server_id = generate_server_id(server_ip, server_name)  # Generate same ID as server
                 
                 # Add to legacy views for backward compatibility
                 group_view_servers.add(server_id)
@@ -91,7 +157,7 @@ while True:
                 # Add to unified group view
                 group_view.add_participant(str(server_id), 'server', (server_ip, 0), server_name)
                 
-                print(f"Discovered server: {server_name} at {server_ip} (ID: {server_id})")
+                safe_print(f"Discovered server: {server_name} at {server_ip} (ID: {server_id})")
                 
                 # Trigger election when new server joins
                 if len(group_view_servers) > 1:
@@ -104,18 +170,17 @@ while True:
                 msg_type, probe_ip, probe_server_id = parts[0], parts[1], parts[2]
                 
                 # Don't respond to our own probes
-                my_server_id = hash(socket.gethostbyname(socket.gethostname()) + socket.gethostname()) % 10000
                 if probe_server_id != str(my_server_id):
-                    response = f"SERVER_RESPONSE:{socket.gethostname()}:{socket.gethostbyname(socket.gethostname())}"
-                    print(f"Responding to enhanced server probe from {probe_ip} (Server ID: {probe_server_id})")
+                    response = server_response
+                    safe_print(f"Responding to enhanced server probe from {probe_ip} (Server ID: {probe_server_id})")
                 else:
-                    print(f"Ignoring probe from self: {probe_server_id}")
+                    safe_print(f"Ignoring probe from self: {probe_server_id}")
                     continue
             elif len(parts) >= 2:
                 # Legacy probe format
                 probe_ip = parts[1]
-                response = f"SERVER_RESPONSE:{socket.gethostname()}:{socket.gethostbyname(socket.gethostname())}"
-                print(f"Responding to legacy server probe from {probe_ip}")
+                response = server_response
+                safe_print(f"Responding to legacy server probe from {probe_ip}")
             else:
                 continue
         elif msg.startswith("SERVER_PROBE_CAPABLE:"):
@@ -123,10 +188,10 @@ while True:
             parts = msg.split(":")
             if len(parts) >= 4:
                 msg_type, server_ip, hostname, server_id = parts[0], parts[1], parts[2], parts[3]
-                print(f"Server {hostname} (ID: {server_id}) announced probe capability")
+                safe_print(f"Server {hostname} (ID: {server_id}) announced probe capability")
                 
                 # Add to group views if not already present
-                server_id_int = int(server_id) if server_id.isdigit() else hash(server_ip + hostname) % 10000
+                server_id_int = int(server_id) if server_id.isdigit() else generate_server_id(server_ip, hostname)
                 group_view_servers.add(server_id_int)
                 server_last_seen[server_id_int] = time.time()
                 
@@ -141,7 +206,7 @@ while True:
                 # Update client activity in both legacy and unified views
                 client_last_seen[client_addr] = time.time()
                 group_view.update_participant_activity(client_id)
-                print(f"Received heartbeat from client {client_id}")
+                safe_print(f"Received heartbeat from client {client_id}")
             continue  # Don't send response for heartbeat messages
         elif msg == "status":
             # Handle system status requests
@@ -158,16 +223,16 @@ while True:
             except json.JSONDecodeError:
                 pass
             
-            response = f"\nYour message was received by {socket.gethostname()}!"
+            response = f"\nYour message was received by {local_hostname}!"
 
         UDP_socket.sendto(response.encode(), client_addr)
 
     except KeyboardInterrupt:
-        print("\nServer stopped by user.")
+        safe_print("\nServer stopped by user.")
         UDP_socket.close()
         break
 
     except socket.timeout:
-        print("\nTimeout: no response")
+        safe_print("\nTimeout: no response")
         UDP_socket.close()
         break
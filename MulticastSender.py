@@ -1,4 +1,6 @@
+import os
 import socket
+import selectors
 import threading
 import pickle
 
@@ -33,7 +35,10 @@ except socket.timeout:
     exit()
 
 
-client_socket.settimeout(3000)
+# Receiving blocks in select() from here on; the sender wakes it through this
+# pipe on exit instead of the receiver polling with a socket timeout
+client_socket.settimeout(None)
+wake_r, wake_w = os.pipe()
 
 #Allowing Clients to send messages in Multicast
 def send_messages():
@@ -51,15 +56,20 @@ def send_messages():
 
 #Allowing Clients to receive messages in Multicast
 def receive_messages():
-    while True:
-        try:
-            data, server = client_socket.recvfrom(BUFFER_SIZE)
-            print(f"\nReceived message from {server}: {data.decode()}")
-        except socket.timeout:
-            print("\nTimeout: no response")
-            break
-        except KeyboardInterrupt:
-            break
+    sel = selectors.DefaultSelector()
+    sel.register(client_socket, selectors.EVENT_READ, 'net')
+    sel.register(wake_r, selectors.EVENT_READ, 'stop')
+    try:
+        while True:
+            for key, _ in sel.select():
+                if key.data == 'stop':
+                    return
+                data, server = client_socket.recvfrom(BUFFER_SIZE)
+                print(f"\nReceived message from {server}: {data.decode()}")
+    except (OSError, KeyboardInterrupt):
+        pass
+    finally:
+        sel.close()
 
 
 #Das kommt nachher in server!!!
@@ -69,6 +79,8 @@ if __name__ == "__main__":
     #print(print_lock)
     send_messages()
 
+    os.write(wake_w, b'x')
+    receiver_thread.join()
     client_socket.close()
    
 
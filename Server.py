@@ -5,26 +5,14 @@ from resources.utils import group_view_servers
 from resources.utils import group_view_clients
 from resources.utils import server_last_seen
 from resources.utils import MULTICAST_GROUP_ADDRESS
-from LeaderElection import initialize_election, trigger_election, detect_leader_failure, get_current_leader
+from LeaderElection import initialize_election, trigger_election, detect_leader_failure, get_current_leader, stop_election
 from GroupView import get_group_view, start_group_view, print_system_status
 from DiscoveryManager import DiscoveryManager
 from FaultTolerance import initialize_fault_tolerance, get_fault_tolerance_manager
-
-# Getting the IP address by trying to reach unreachable address, method from:https://stackoverflow.com/questions/166506/finding-local-ip-addresses-using-pythons-stdlib 
-def getIP():
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.settimeout(0)
-    try:
-        s.connect(('10.254.254.254', 1))
-        IP = s.getsockname()[0]
-    except Exception:
-        IP = '127.0.0.1'
-    finally:
-        s.close()
-    return IP
+from resources.utils import get_local_ip
 
 # Server Configuration and Initialization
-server_ip = getIP()  # Get this server's IP address
+server_ip = get_local_ip()  # Get this server's IP address (cached)
 hostname = socket.gethostname()  # Get this server's hostname
 
 # Import standardized utilities
@@ -72,9 +60,12 @@ def probe_servers():
     try:
         while True:
             data, addr = probe_socket.recvfrom(1024)
-            if data.decode().startswith("SERVER_RESPONSE:"):
-                group_view_servers.add(addr)
-                server_last_seen[addr] = time.time()
+            parts = data.decode().split(":")
+            if len(parts) >= 3 and parts[0] == "SERVER_RESPONSE":
+                # Track the responder by its integer server ID, like every other view entry
+                responder_id = generate_server_id(parts[2], parts[1])
+                group_view_servers.add(responder_id)
+                server_last_seen[responder_id] = time.time()
     except socket.timeout:
         pass
     finally:
@@ -85,17 +76,25 @@ def cleanup_dead_servers():
     current_time = time.time()
     dead_servers = []
     
-    for server in list(group_view_servers):
+    for server in group_view_servers.snapshot():
+        if server == server_id:
+            continue  # Nothing refreshes our own entry
         if current_time - server_last_seen.get(server, 0) > 30:  # 30 second timeout
             dead_servers.append(server)
     
-    for server in dead_servers:
-        group_view_servers.discard(server)
-        server_last_seen.pop(server, None)
-        print(f"Removed dead server: {server}")
-        
-        # Check if leader failed and trigger election
-        detect_leader_failure()
+    if not dead_servers:
+        return
+    
+    # Drop them from the unified view too, publishing one snapshot for the batch
+    with get_group_view().bulk_update() as view:
+        for server in dead_servers:
+            group_view_servers.discard(server)
+            server_last_seen.pop(server, None)
+            view.remove_participant(str(server))
+            print(f"Removed dead server: {server}")
+    
+    # Check if leader failed and trigger election
+    detect_leader_failure()
 
 def start_server_discovery():
     """Start server discovery thread"""
@@ -137,8 +136,7 @@ if __name__ == '__main__':
             print("Leader crashed, triggering election")
             trigger_election()
         # Remove from group views
-        if int(failed_node_id) in group_view_servers:
-            group_view_servers.discard(int(failed_node_id))
+        group_view_servers.discard(int(failed_node_id))
         group_view.remove_participant(str(failed_node_id))
     
     def on_partition_recovery(partition_detector):
@@ -153,6 +151,10 @@ if __name__ == '__main__':
     ft_manager.register_recovery_callback('crash', on_crash_recovery)
     ft_manager.register_recovery_callback('partition', on_partition_recovery)
     
+    # Servers cut off by a partition stay in the view as inactive until they're reachable again
+    ft_manager.partition_detector.add_transition_callback('node_unreachable', group_view.mark_participant_inactive)
+    ft_manager.partition_detector.add_transition_callback('node_reachable', group_view.update_participant_activity)
+    
     # Initialize election system
     initialize_election(server_id, server_ip)
     
@@ -178,7 +180,9 @@ if __name__ == '__main__':
     # Add this server to the group views
     group_view_servers.add(server_id)
     server_last_seen[server_id] = time.time()
-    group_view.add_participant(str(server_id), 'server', (server_ip, 0), socket.gethostname())
+    # Nothing refreshes our own entry, so it must not time out
+    group_view.add_participant(str(server_id), 'server', (server_ip, 0), socket.gethostname(),
+                               timeout=float('inf'))
     
     # Start fault tolerance
     ft_manager.start()
@@ -197,6 +201,12 @@ if __name__ == '__main__':
     for key, value in ft_stats.items():
         print(f"  {key}: {value}")
     
-    # Wait a bit for initial discovery, then show system status
-    time.sleep(5)
-    showSystemcomponents()
\ No newline at end of file
+    try:
+        # Wait a bit for initial discovery, then show system status
+        time.sleep(5)
+        showSystemcomponents()
+    finally:
+        # Shut down in reverse start order
+        discovery_manager.stop_discovery()
+        ft_manager.stop()
+        stop_election()
\ No newline at end of file
@@ -0,0 +1,184 @@
+import ctypes
+import ctypes.util
+import errno as errno_codes
+import functools
+import os
+import socket
+import struct
+import sys
+from typing import List, Sequence, Tuple
+
+# Batched UDP I/O: one sendmmsg()/recvmmsg() syscall for many datagrams on
+# Linux, falling back to a sendto()/recvfrom() loop everywhere else
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [('sin_family', ctypes.c_ushort),
+                ('sin_port', ctypes.c_ubyte * 2),   # network byte order
+                ('sin_addr', ctypes.c_ubyte * 4),
+                ('sin_zero', ctypes.c_ubyte * 8)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr),
+                ('msg_len', ctypes.c_uint)]
+
+def _load_libc_func(name: str, argtypes: list):
+    """Get a libc function such as sendmmsg, or None where it isn't available"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        func = getattr(libc, name)
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = argtypes
+    func.restype = ctypes.c_int
+    return func
+
+_sendmmsg = _load_libc_func('sendmmsg', [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int])
+_recvmmsg = _load_libc_func('recvmmsg', [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p])
+_MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0)  # Elsewhere the socket must be non-blocking
+_pack_port = struct.Struct('!H').pack
+
+@functools.lru_cache(maxsize=256)
+def _sockaddr(addr: Tuple[str, int]) -> _SockAddrIn:
+    """Build a sockaddr_in for a numeric IPv4 (ip, port) pair, once per address"""
+    sa = _SockAddrIn()
+    sa.sin_family = socket.AF_INET
+    sa.sin_port[:] = _pack_port(addr[1])
+    sa.sin_addr[:] = socket.inet_aton(addr[0])
+    return sa
+
+def _sendto_loop(sock: socket.socket, messages: Sequence[Tuple[bytes, Tuple[str, int]]]) -> int:
+    for payload, addr in messages:
+        sock.sendto(payload, addr)
+    return len(messages)
+
+def sendmmsg(sock: socket.socket, messages: Sequence[Tuple[bytes, Tuple[str, int]]]) -> int:
+    """
+    Send several UDP datagrams with as few syscalls as possible.
+
+    Args:
+        sock: AF_INET datagram socket to send from
+        messages: (payload, (ip, port)) pairs; addresses must be numeric IPv4
+
+    Returns:
+        Number of datagrams sent
+    """
+    if not messages:
+        return 0
+    if _sendmmsg is None or sock.family != socket.AF_INET:
+        return _sendto_loop(sock, messages)
+
+    count = len(messages)
+    try:
+        addrs = [_sockaddr(addr) for _, addr in messages]
+    except OSError:
+        return _sendto_loop(sock, messages)  # Hostnames etc. need the resolver
+
+    # Keep the payload buffers referenced until the syscall returns
+    buffers: List[ctypes.Array] = [ctypes.create_string_buffer(payload, len(payload)) for payload, _ in messages]
+    iovecs = (_IOVec * count)()
+    msgvec = (_MMsgHdr * count)()
+    for i in range(count):
+        iovecs[i].iov_base = ctypes.cast(buffers[i], ctypes.c_void_p)
+        iovecs[i].iov_len = len(messages[i][0])
+        hdr = msgvec[i].msg_hdr
+        hdr.msg_name = ctypes.cast(ctypes.pointer(addrs[i]), ctypes.c_void_p)
+        hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+        hdr.msg_iov = ctypes.pointer(iovecs[i])
+        hdr.msg_iovlen = 1
+
+    sent = 0
+    fd = sock.fileno()
+    base = ctypes.addressof(msgvec)
+    while sent < count:
+        # The kernel may accept only part of the batch; resubmit the remainder
+        result = _sendmmsg(fd, base + sent * ctypes.sizeof(_MMsgHdr), count - sent, 0)
+        if result < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        sent += result
+    return sent
+
+class RecvBatch:
+    """
+    Pre-allocated buffers for draining up to `count` datagrams per recvmmsg().
+
+    Payloads are returned as memoryviews into the shared buffer and are only
+    valid until the next call to recv().
+    """
+    
+    def __init__(self, count: int = 32, size: int = 1024):
+        self.count = count
+        self.size = size
+        self._buffer = bytearray(count * size)
+        self._view = memoryview(self._buffer)
+        
+        # Headers, iovecs and source addresses are wired up once and reused
+        self._names = (_SockAddrIn * count)()
+        self._iovecs = (_IOVec * count)()
+        self._msgvec = (_MMsgHdr * count)()
+        base = ctypes.addressof((ctypes.c_char * len(self._buffer)).from_buffer(self._buffer))
+        for i in range(count):
+            self._iovecs[i].iov_base = base + i * size
+            self._iovecs[i].iov_len = size
+            hdr = self._msgvec[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._names[i])
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+    
+    def _recvfrom_loop(self, sock: socket.socket) -> List[Tuple[memoryview, Tuple[str, int]]]:
+        received = []
+        for i in range(self.count):
+            offset = i * self.size
+            try:
+                nbytes, addr = sock.recvfrom_into(self._view[offset:offset + self.size], self.size, _MSG_DONTWAIT)
+            except BlockingIOError:
+                break
+            received.append((self._view[offset:offset + nbytes], addr))
+        return received
+    
+    def recv(self, sock: socket.socket) -> List[Tuple[memoryview, Tuple[str, int]]]:
+        """
+        Receive whatever is queued on the socket without blocking.
+
+        Args:
+            sock: AF_INET datagram socket to read from
+
+        Returns:
+            Up to `count` (payload, (ip, port)) pairs; empty if nothing is queued
+        """
+        if _recvmmsg is None or sock.family != socket.AF_INET:
+            return self._recvfrom_loop(sock)
+        
+        namelen = ctypes.sizeof(_SockAddrIn)
+        for i in range(self.count):
+            self._msgvec[i].msg_hdr.msg_namelen = namelen  # The kernel overwrites it
+        
+        result = _recvmmsg(sock.fileno(), ctypes.addressof(self._msgvec), self.count, _MSG_DONTWAIT, None)
+        if result < 0:
+            errno = ctypes.get_errno()
+            if errno in (errno_codes.EAGAIN, errno_codes.EWOULDBLOCK):
+                return []
+            raise OSError(errno, os.strerror(errno))
+        
+        received = []
+        for i in range(result):
+            name = self._names[i]
+            addr = (socket.inet_ntoa(bytes(name.sin_addr)), int.from_bytes(bytes(name.sin_port), 'big'))
+            offset = i * self.size
+            received.append((self._view[offset:offset + self._msgvec[i].msg_len], addr))
+        return received
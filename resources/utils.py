@@ -5,9 +5,159 @@ MULTICAST_GROUP_ADDRESS = (MULTICAST_IP, MULTICAST_PORT)
 MULTICAST_TTL=2
 BUFFER_SIZE = 10240
 
+import threading
+from collections import OrderedDict
+
+class SortedIdSet(set):
+    """
+    Set that publishes immutable snapshots of its members.
+    
+    Mutations take a lock and drop the cached snapshots; readers grab the
+    current frozenset / sorted tuple by reference, so hot paths (e.g. an
+    election round) never copy the set or race a concurrent add. Snapshots
+    are rebuilt lazily, once per membership change.
+    """
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._lock = threading.Lock()
+        self._frozen = None
+        self._sorted = None
+        self.version = 0
+    
+    def _invalidate(self):
+        self._frozen = None
+        self._sorted = None
+        self.version += 1
+    
+    def snapshot(self) -> frozenset:
+        """Get an immutable view of the current members"""
+        snapshot = self._frozen
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._frozen
+                if snapshot is None:
+                    snapshot = self._frozen = frozenset(self)
+        return snapshot
+    
+    def sorted_tuple(self) -> tuple:
+        """Get the members in ascending order"""
+        snapshot = self._sorted
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._sorted
+                if snapshot is None:
+                    snapshot = self._sorted = tuple(sorted(self))
+        return snapshot
+    
+    def add(self, item):
+        if item not in self:
+            with self._lock:
+                super().add(item)
+                self._invalidate()
+    
+    def discard(self, item):
+        if item in self:
+            with self._lock:
+                super().discard(item)
+                self._invalidate()
+    
+    def remove(self, item):
+        with self._lock:
+            super().remove(item)
+            self._invalidate()
+    
+    def pop(self):
+        with self._lock:
+            item = super().pop()
+            self._invalidate()
+        return item
+    
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._invalidate()
+    
+    def update(self, *others):
+        with self._lock:
+            super().update(*others)
+            self._invalidate()
+    
+    def difference_update(self, *others):
+        with self._lock:
+            super().difference_update(*others)
+            self._invalidate()
+    
+    def intersection_update(self, *others):
+        with self._lock:
+            super().intersection_update(*others)
+            self._invalidate()
+    
+    def symmetric_difference_update(self, other):
+        with self._lock:
+            super().symmetric_difference_update(other)
+            self._invalidate()
+    
+    def __ior__(self, other):
+        self.update(other)
+        return self
+    
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+    
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+    
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+
+class RecentAddressSet:
+    """
+    Set of client addresses capped at the most recently seen entries.
+    
+    Re-adding an address refreshes it; once the cap is exceeded the address
+    seen longest ago is dropped, so long-running servers keep bounded memory.
+    """
+    
+    def __init__(self, capacity: int = 10_000):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def add(self, addr):
+        with self._lock:
+            self._entries[addr] = None
+            self._entries.move_to_end(addr)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+    
+    def discard(self, addr):
+        with self._lock:
+            self._entries.pop(addr, None)
+    
+    def copy(self) -> list:
+        """Get a snapshot of the addresses, oldest first"""
+        with self._lock:
+            return list(self._entries)
+    
+    def __contains__(self, addr) -> bool:
+        return addr in self._entries
+    
+    def __iter__(self):
+        return iter(self.copy())
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __repr__(self) -> str:
+        return f"{{{', '.join(map(repr, self.copy()))}}}"
+
 #Defining a view where we can see all the participants in the system
-group_view_clients = set() 
-group_view_servers = set()
+group_view_clients = RecentAddressSet()
+group_view_servers = SortedIdSet()
 
 # Server tracking structures
 server_last_seen = {}  # Track when servers were last seen
@@ -34,6 +184,8 @@ SOCKET_TIMEOUT = 10                    # Default socket timeout
 MAX_RETRY_ATTEMPTS = 3                 # Maximum retry attempts for operations
 DISCOVERY_STARTUP_TIMEOUT = 15         # Total time for startup discovery phase
 RETRY_DELAY = 2                        # Delay between retry attempts
+BACKOFF_BASE = 0.5                     # Base delay for jittered exponential backoff
+BACKOFF_CAP = 30                       # Upper bound on a single backoff delay
 
 # Message reliability settings
 MESSAGE_TIMEOUT = 5                    # Timeout for message acknowledgment
@@ -51,11 +203,59 @@ LARGE_BUFFER_SIZE = 10240              # Large buffer for multicast operations
 import socket
 import uuid
 import hashlib
+import functools
+import struct
+import zlib
+import random
+import atexit
+import queue
+import sys
+
+# ip_mreq for joining MULTICAST_IP on any interface, packed once at import.
+# "=" gives the standard 8-byte layout instead of native "l" (8 bytes on LP64)
+MULTICAST_MREQ = struct.pack("=4sL", socket.inet_aton(MULTICAST_IP), socket.INADDR_ANY)
+
+@functools.lru_cache(maxsize=1)
+def get_local_ip() -> str:
+    """
+    Get this machine's outward-facing IP address.
+    
+    Method from: https://stackoverflow.com/questions/166506/finding-local-ip-addresses-using-pythons-stdlib
+    
+    Connecting a UDP socket to an unreachable address makes the OS pick the
+    outgoing interface without sending anything. The result is cached, so only
+    the first call creates a socket.
+    
+    Returns:
+        Local IP address, or '127.0.0.1' if no route is available
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.settimeout(0)
+    try:
+        s.connect(('10.254.254.254', 1))
+        ip = s.getsockname()[0]
+    except Exception:
+        ip = '127.0.0.1'
+    finally:
+        s.close()
+    return ip
 
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """
+    Delay before retry number `attempt` (0-based): exponential growth up to
+    `cap`, plus up to `base` seconds of random jitter so that clients failing
+    together don't all retry in lock-step.
+    """
+    return min(cap, base * (2 ** attempt)) + random.uniform(0, base)
+
+@functools.lru_cache(maxsize=4096)
 def generate_server_id(server_ip: str, hostname: str = None) -> int:
     """
     Generate consistent server ID using IP address and hostname.
     
+    Results are cached: the same few peers announce over and over, so after the
+    first packet from each the SHA-256 is skipped.
+    
     Args:
         server_ip: The server's IP address
         hostname: The server's hostname (optional, will use current hostname if not provided)
@@ -71,6 +271,112 @@ def generate_server_id(server_ip: str, hostname: str = None) -> int:
     hash_value = hashlib.sha256(id_string.encode()).hexdigest()
     return int(hash_value[:8], 16) % 10000
 
+# Binary chat frames: fixed header (frame type, group id, user id, request id,
+# payload length) followed by the UTF-8 text. Frame types stay below FRAME_TYPE_LIMIT so a frame's
+# first byte can never be mistaken for the start of a text protocol message.
+CHAT_FRAME_HEADER = struct.Struct("!BHIHH")
+CHAT_FRAME_PREFIX = struct.Struct("!BHI")  # Leading (type, group, user) fields of the header
+CHAT_FRAME_SUFFIX = struct.Struct("!HH")   # Trailing (request id, payload length) fields
+_pack_header = CHAT_FRAME_HEADER.pack_into      # Bound once; the format is parsed only at import
+_unpack_header = CHAT_FRAME_HEADER.unpack_from
+_HEADER_SIZE = CHAT_FRAME_HEADER.size
+FRAME_CHAT = 0x01
+FRAME_ACK = 0x02  # Server's reply to a chat frame, echoing its request id
+FRAME_FLAG_ALIVE = 0x10  # Sender is alive; the frame doubles as its heartbeat
+FRAME_TYPE_MASK = 0x0F
+FRAME_TYPE_LIMIT = 0x20
+DEFAULT_GROUP_ID = 0
+
+def user_id_for(client_id: str) -> int:
+    """
+    Derive the 32-bit user ID carried in chat frame headers.
+    
+    Args:
+        client_id: Client ID string
+    
+    Returns:
+        Unsigned 32-bit integer ID
+    """
+    return zlib.crc32(client_id.encode())
+
+def pack_chat_frame(frame_type: int, group_id: int, user_id: int, payload: bytes,
+                    request_id: int = 0) -> bytearray:
+    """
+    Build a binary chat frame.
+    
+    Args:
+        frame_type: Frame type (e.g. FRAME_CHAT), optionally OR'ed with FRAME_FLAG_ALIVE
+        group_id: Chat group ID
+        user_id: Sender's user ID (see user_id_for)
+        payload: Encoded message text
+        request_id: 16-bit ID the reply echoes back (0 if no reply is tracked)
+    
+    Returns:
+        Frame ready to send
+    """
+    frame = bytearray(_HEADER_SIZE + len(payload))
+    _pack_header(frame, 0, frame_type, group_id, user_id, request_id, len(payload))
+    frame[_HEADER_SIZE:] = payload
+    return frame
+
+def is_chat_frame(data: bytes) -> bool:
+    """Check whether a datagram is a binary chat frame rather than a text message"""
+    return len(data) >= _HEADER_SIZE and data[0] < FRAME_TYPE_LIMIT
+
+def unpack_chat_frame(data: bytes):
+    """
+    Parse a binary chat frame without decoding its payload.
+    
+    Args:
+        data: Received datagram
+    
+    Returns:
+        (frame_type, group_id, user_id, request_id, payload) where payload is a memoryview
+    """
+    frame_type, group_id, user_id, request_id, length = _unpack_header(data, 0)
+    return frame_type, group_id, user_id, request_id, memoryview(data)[_HEADER_SIZE:_HEADER_SIZE + length]
+
+# Binary discovery frames: fixed-size (message type, IPv4 address, NUL-padded
+# hostname, server id). Types start at 0x80, clear of chat frames (below
+# FRAME_TYPE_LIMIT) and of the ASCII text protocol.
+DISCOVERY_FRAME = struct.Struct("!B4s32sI")
+DISCOVERY_ALIVE = 0x81
+DISCOVERY_PROBE = 0x82
+DISCOVERY_RESPONSE = 0x83
+DISCOVERY_PROBE_CAPABLE = 0x84
+
+def pack_discovery_frame(msg_type: int, ip: str, hostname: str, server_id: int) -> bytes:
+    """
+    Build a binary discovery frame.
+    
+    Args:
+        msg_type: One of the DISCOVERY_* types
+        ip: Sender's IPv4 address
+        hostname: Sender's hostname (truncated to 32 bytes)
+        server_id: Sender's server ID (see generate_server_id)
+    
+    Returns:
+        Frame ready to send
+    """
+    return DISCOVERY_FRAME.pack(msg_type, socket.inet_aton(ip), hostname.encode()[:32], server_id)
+
+def is_discovery_frame(data: bytes) -> bool:
+    """Check whether a datagram is a binary discovery frame"""
+    return len(data) == DISCOVERY_FRAME.size and DISCOVERY_ALIVE <= data[0] <= DISCOVERY_PROBE_CAPABLE
+
+def unpack_discovery_frame(data: bytes):
+    """
+    Parse a binary discovery frame.
+    
+    Args:
+        data: Received datagram
+    
+    Returns:
+        (msg_type, ip, hostname, server_id)
+    """
+    msg_type, ip, hostname, server_id = DISCOVERY_FRAME.unpack_from(data, 0)
+    return msg_type, socket.inet_ntoa(ip), hostname.rstrip(b"\0").decode(errors='replace'), server_id
+
 def generate_client_id(username: str = None) -> str:
     """
     Generate unique client ID using username and UUID.
@@ -143,3 +449,71 @@ def create_multicast_socket(ttl: int = MULTICAST_TTL) -> socket.socket:
     sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     return sock
+
+def create_multicast_receiver(port: int = MULTICAST_PORT) -> socket.socket:
+    """
+    Create a socket bound to the multicast port and joined to the group.
+    
+    SO_REUSEPORT (where the platform has it) lets several receivers on one
+    host share the port, e.g. multiple servers in a local test; the kernel
+    then hashes unicast traffic across their sockets, so each is served on
+    its own CPU. Multicast datagrams are still copied to every member.
+    
+    Args:
+        port: Port to bind
+    
+    Returns:
+        Bound socket subscribed to MULTICAST_IP
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except OSError:
+            pass  # Defined but unsupported by this kernel; SO_REUSEADDR still works
+    sock.bind(('', port))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, MULTICAST_MREQ)
+    return sock
+
+
+# Console output queue drained by a single writer thread so callers never block on stdout
+_print_queue = queue.Queue()
+_print_thread = None
+_print_thread_lock = threading.Lock()
+
+def _print_writer():
+    """Write queued lines to stdout, flushing whenever the queue runs dry"""
+    while True:
+        text = _print_queue.get()
+        sys.stdout.write(text)
+        if _print_queue.empty():
+            sys.stdout.flush()
+
+def _drain_print_queue():
+    """Write out anything still queued when the interpreter exits"""
+    while True:
+        try:
+            sys.stdout.write(_print_queue.get_nowait())
+        except queue.Empty:
+            break
+    sys.stdout.flush()
+
+atexit.register(_drain_print_queue)
+
+def safe_print(*args, sep: str = ' ', end: str = '\n'):
+    """
+    Non-blocking replacement for print().
+    
+    Args:
+        *args: Values to print
+        sep: Separator between values
+        end: String appended after the last value
+    """
+    global _print_thread
+    if _print_thread is None:
+        with _print_thread_lock:
+            if _print_thread is None:
+                _print_thread = threading.Thread(target=_print_writer, daemon=True)
+                _print_thread.start()
+    _print_queue.put(sep.join(map(str, args)) + end)
@@ -0,0 +1,71 @@
+import json
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from FaultTolerance import FaultToleranceManager, MessageType, PartitionDetector, ReliableMessage
+
+
+class ReceivedMessageWindowTest(unittest.TestCase):
+    """Duplicate detection must outlast a sender's whole retry schedule"""
+    
+    def setUp(self):
+        self.manager = FaultToleranceManager("1", node_type="client")
+        self.addCleanup(self.manager.stop)
+        self.clock = 1000.0
+        patcher = mock.patch('FaultTolerance.time.monotonic', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_late_resend_is_still_a_duplicate(self):
+        self.manager._remember_received("first")
+        
+        # Every resend goes out a full retry tick late
+        retries = ReliableMessage.MAX_RETRIES
+        late_gap = self.manager.message_timeout + self.manager.RETRY_CHECK_INTERVAL * 1.1
+        self.clock += late_gap * retries
+        self.assertGreater(late_gap * retries, (retries + 1) * self.manager.message_timeout)
+        
+        self.manager._remember_received("other")  # Expires whatever has fallen out of the window
+        self.assertIn("first", self.manager.received_messages)
+    
+    def test_ids_past_the_retry_window_are_forgotten(self):
+        self.manager._remember_received("first")
+        self.clock += 3600
+        self.manager._remember_received("other")
+        self.assertNotIn("first", self.manager.received_messages)
+        self.assertIn("other", self.manager.received_messages)
+
+
+
+class PartitionProbeTest(unittest.TestCase):
+    """A probe round must survive replies that aren't message objects"""
+    
+    def setUp(self):
+        self.detector = PartitionDetector("me")
+        self.detector.probe_timeout = 1
+        self.addCleanup(self.detector.close)
+        self.peer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.peer.bind(('127.0.0.1', 0))
+        self.addCleanup(self.peer.close)
+        patcher = mock.patch('FaultTolerance.MULTICAST_GROUP_ADDRESS', self.peer.getsockname())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _answer_probe(self):
+        _, addr = self.peer.recvfrom(2048)
+        self.peer.sendto(b"5", addr)
+        self.peer.sendto(b'"x"', addr)
+        reply = {'type': MessageType.PARTITION_PROBE, 'sender_id': 'peer', 'target_id': 'me'}
+        self.peer.sendto(json.dumps(reply).encode(), addr)
+    
+    def test_non_object_json_does_not_end_the_round(self):
+        responder = threading.Thread(target=self._answer_probe, daemon=True)
+        responder.start()
+        self.assertEqual(self.detector._probe_all({'peer'}), {'peer'})
+        responder.join(1)
+
+
+if __name__ == '__main__':
+    unittest.main()